@@ -0,0 +1,323 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import cache
+import dashboards
+import data_store
+
+# Schlanke, nur lesende Abfrage-Schnittstelle für die Daten hinter den Dashboards, damit
+# Partner die Reihen für eigene Auswertungen abrufen können, ohne die Streamlit-Seite
+# auszulesen. Sie läuft als eigener Prozess neben der App und nutzt dieselben
+# aufbereiteten Datensätze (data/cache/, siehe ingest.py) und dieselbe Indikator-Liste
+# (dashboards.DASHBOARDS). Antworten werden als CSV oder JSON gestreamt; das ETag hängt an
+# der Datenversion, eine Wiederholungsabfrage mit If-None-Match kostet nur ein 304.
+#
+#   python api.py                          # http://127.0.0.1:8502
+#   python api.py --host 0.0.0.0 --port 8600
+#
+# Endpunkte (nur GET, Parameter optional, mehrfach angebbare mit * markiert):
+#   /meta          Datenversionen, Dashboards mit Indikatoren, Handelsrichtungen,
+#                  Polymerarten/Packmittel und verfügbare Zeiträume
+#   /konjunktur    dashboard, indikator*, von, bis, format
+#   /aussenhandel  richtung*, packmittel*, aufloesung (quartal/monat), aufschluesseln (1),
+#                  von, bis, format
+#   /cache         Treffer, Fehlschläge, Verdrängungen und Größe der Caches dieses Prozesses
+# von/bis als Jahr ('2019') oder Quartal ('2019-Q3'); Monate werden über ihr Quartal
+# gefiltert. format: json (Standard, Liste von Datensätzen) oder csv (Semikolon als Trenner,
+# Dezimalkomma).
+#
+#   curl "http://127.0.0.1:8502/konjunktur?dashboard=Konjunktur&indikator=Umsatz&von=2019&format=csv"
+#   curl "http://127.0.0.1:8502/aussenhandel?richtung=Ausfuhr&packmittel=Gesamt_Polymere&aufloesung=monat&aufschluesseln=1"
+
+PORT = int(os.environ.get("IK_DASHBOARD_API_PORT", "8502"))
+
+# Abgleich mit den Quelldateien in data/ im Hintergrund wie in der App (0 = aus)
+REFRESH_SECONDS = float(os.environ.get("IK_DASHBOARD_REFRESH_SECONDS", "30"))
+
+# Zeilen je gestreamtem Block
+CHUNK_ROWS = 500
+
+# CSV im deutschen Format (wie die Downloads der App, export.py)
+CSV_OPTIONS = {"sep": ";", "decimal": ","}
+
+FORMATS = {"json": "application/json; charset=utf-8", "csv": "text/csv; charset=utf-8"}
+
+# Speicherbudget der geladenen Datensätze in MB (0 = nur nach Anzahl begrenzt)
+DATASET_CACHE_MB = float(os.environ.get("IK_DASHBOARD_API_CACHE_MB", "256"))
+
+# Geladene Datensätze je (Art, Datenversion), für alle Anfragen geteilt (nur lesend!)
+_datasets = cache.LRUCache(maxsize=6, max_bytes=int(DATASET_CACHE_MB * 1024 * 1024) or None, name="api_datensaetze")
+
+
+class QueryError(Exception):
+    # Ungültige Abfrage (400); Fehler in den Daten selbst bleiben ValueError (503)
+    pass
+
+
+def dataset(kind, info, load):
+    # Beim ersten Laden einer neuen Datenversion werden ältere Versionen dieser Art sofort
+    # freigegeben, statt bis zur Verdrängung Speicher zu belegen
+    def create():
+        _datasets.invalidate(lambda key: key[0] == kind and key[1] != info["version"])
+        return load()
+    return _datasets.get_or_create((kind, info["version"]), create)
+
+
+def konjunktur_data(info):
+    def load():
+        df = data_store.read_dataset(info)
+        return df.assign(Periode=[data_store.period_key(j, data_store.QUARTALE[q])
+                                  for j, q in zip(df["Jahr"], df["Monat"])])
+    return dataset("konjunktur", info, load)
+
+
+def trade_data(info):
+    return dataset("aussenhandel", info, lambda: data_store.load_quarterly(info))
+
+
+def cube_data(info):
+    return dataset("cube", info, lambda: data_store.build_cube_index(data_store.read_derived(info, "cube")))
+
+
+def one(params, name, default=None):
+    values = params.get(name, [])
+    if len(values) > 1:
+        raise QueryError(f"Parameter '{name}' darf nur einmal angegeben werden")
+    return values[0] if values else default
+
+
+def choices(params, name, options):
+    # Mehrfach angebbarer Parameter; ohne Angabe gelten alle Optionen
+    values = params.get(name) or list(options)
+    unknown = [v for v in values if v not in options]
+    if unknown:
+        raise QueryError(f"Unbekannte Werte für '{name}': {', '.join(unknown)} (möglich: {', '.join(options)})")
+    return values
+
+
+def parse_period(text, end):
+    # '2019' -> erstes bzw. letztes Quartal des Jahres, '2019-Q3' -> dieses Quartal
+    try:
+        if "-Q" in text:
+            jahr, quartal = text.split("-Q")
+            if not 1 <= int(quartal) <= 4:
+                raise ValueError
+            return data_store.period_key(int(jahr), int(quartal))
+        return data_store.period_key(int(text), 4 if end else 1)
+    except ValueError:
+        raise QueryError(f"Ungültiger Zeitraum '{text}' (erwartet z.B. 2019 oder 2019-Q3)")
+
+
+def period_range(params, first, last):
+    von = one(params, "von")
+    bis = one(params, "bis")
+    von = parse_period(von, end=False) if von else first
+    bis = parse_period(bis, end=True) if bis else last
+    if von > bis:
+        raise QueryError("'von' liegt nach 'bis'")
+    return von, bis
+
+
+def konjunktur_rows(infos, params):
+    dashboard = one(params, "dashboard")
+    if dashboard is not None and dashboard not in dashboards.DASHBOARDS:
+        raise QueryError(f"Unbekanntes Dashboard '{dashboard}' (möglich: {', '.join(dashboards.DASHBOARDS)})")
+    erlaubt = dashboards.indicator_options(dashboard) if dashboard else dashboards.all_indicators()
+    indikatoren = list(dict.fromkeys(choices(params, "indikator", erlaubt)))
+
+    df = konjunktur_data(infos["konjunktur"])
+    von, bis = period_range(params, df["Periode"].min(), df["Periode"].max())
+    rows = df.loc[df["Periode"].between(von, bis), ["Zeitachse"] + indikatoren]
+    return rows.rename(columns={"Zeitachse": "Zeitraum"})
+
+
+def aussenhandel_rows(infos, params):
+    info = infos["aussenhandel"]
+    df = trade_data(info)
+    richtungen = choices(params, "richtung", df["Import/Export"].dropna().unique().tolist())
+    packmittel = choices(params, "packmittel", df["Polymerart/Packmittel"].dropna().unique().tolist())
+    aufloesung = one(params, "aufloesung", "quartal")
+    if aufloesung not in ("quartal", "monat"):
+        raise QueryError("'aufloesung' ist 'quartal' oder 'monat'")
+    aufschluesseln = one(params, "aufschluesseln", "0") == "1"
+    von, bis = period_range(params, *info["quartale"])
+
+    if aufloesung == "quartal" and not aufschluesseln:
+        # Dieselbe Quartalsreihe wie im Diagramm
+        rows = df[
+            df["Import/Export"].isin(richtungen) &
+            df["Polymerart/Packmittel"].isin(packmittel) &
+            df["Periode"].between(von, bis)
+        ].sort_values(["Import/Export", "Polymerart/Packmittel", "Periode"])
+        labels = data_store.period_labels(rows["Periode"])
+    else:
+        # Monate und Aufschlüsselung nach Warennummern aus dem vorberechneten Würfel
+        cube_index = cube_data(info)
+        granularitaet = "Quartal" if aufloesung == "quartal" else "Monat"
+        zeitraeume = range(von, bis + 1)
+        parts = [
+            data_store.select_cube(cube_index, info["hierarchie"], richtung, polymer,
+                                   granularitaet, zeitraeume, aufschluesseln).assign(**{"Import/Export": richtung})
+            for richtung in richtungen for polymer in packmittel
+        ]
+        rows = pd.concat(parts, ignore_index=True)
+        labels = (data_store.period_labels if granularitaet == "Quartal" else data_store.month_labels)(rows["Periode"])
+        rows = rows[["Import/Export", "Polymerart/Packmittel", "Warennummer", "Periode",
+                     data_store.CUBE_VALUE, data_store.CUBE_CHANGE]]
+
+    rows = rows.assign(Zeitraum=labels).drop(columns="Periode")
+    return rows[["Zeitraum"] + [c for c in rows.columns if c != "Zeitraum"]]
+
+
+def meta(infos, params):
+    trade = trade_data(infos["aussenhandel"])
+    konjunktur = konjunktur_data(infos["konjunktur"])
+    return {
+        "versionen": {name: info["version"] for name, info in infos.items()},
+        "dashboards": {name: dashboards.indicator_options(name) for name in dashboards.DASHBOARDS},
+        "konjunktur_zeitraum": data_store.period_labels([konjunktur["Periode"].min(), konjunktur["Periode"].max()]),
+        "handelsrichtungen": trade["Import/Export"].dropna().unique().tolist(),
+        "packmittel": trade["Polymerart/Packmittel"].dropna().unique().tolist(),
+        "hierarchie": infos["aussenhandel"]["hierarchie"],
+        "aussenhandel_zeitraum": data_store.period_labels(infos["aussenhandel"]["quartale"]),
+    }
+
+
+# Pfad -> (benötigte Datensätze, erlaubte Parameter, Abfrage)
+ENDPOINTS = {
+    "/meta": (["konjunktur", "aussenhandel"], set(), meta),
+    "/konjunktur": (["konjunktur"], {"dashboard", "indikator", "von", "bis", "format"}, konjunktur_rows),
+    "/aussenhandel": (["aussenhandel"], {"richtung", "packmittel", "aufloesung", "aufschluesseln",
+                                         "von", "bis", "format"}, aussenhandel_rows),
+}
+
+
+def make_etag(path, infos, params):
+    # Gleiche Datenversion + gleiche (normalisierte) Abfrage = gleiche Antwort
+    key = json.dumps([path, {name: info["version"] for name, info in infos.items()}, sorted(params.items())],
+                     ensure_ascii=False)
+    return '"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def iter_csv(rows):
+    yield rows.iloc[:0].to_csv(index=False, **CSV_OPTIONS)
+    for start in range(0, len(rows), CHUNK_ROWS):
+        yield rows.iloc[start:start + CHUNK_ROWS].to_csv(index=False, header=False, **CSV_OPTIONS)
+
+
+def iter_json(rows):
+    yield "["
+    for start in range(0, len(rows), CHUNK_ROWS):
+        part = rows.iloc[start:start + CHUNK_ROWS].to_json(orient="records", force_ascii=False)[1:-1]
+        yield part if start == 0 else "," + part
+    yield "]"
+
+
+class Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 für Keep-Alive und Chunked-Transfer beim Streamen
+    protocol_version = "HTTP/1.1"
+    server_version = "IK-Dashboard-API"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") == "/cache":
+            # Cache-Statistik dieses Prozesses (ändert sich mit jeder Anfrage, daher ohne ETag)
+            return self.send_json(200, cache.all_stats())
+        endpoint = ENDPOINTS.get(url.path.rstrip("/") or "/meta")
+        if endpoint is None:
+            return self.send_json(404, {"fehler": f"Unbekannter Pfad, möglich: {', '.join(ENDPOINTS)}, /cache"})
+        names, allowed, query = endpoint
+        params = parse_qs(url.query)
+        unknown = set(params) - allowed
+        if unknown:
+            return self.send_json(400, {"fehler": f"Unbekannte Parameter: {', '.join(sorted(unknown))}"})
+        fmt = params.get("format", ["json"])[0]
+        if fmt not in FORMATS:
+            return self.send_json(400, {"fehler": "'format' ist 'json' oder 'csv'"})
+
+        try:
+            infos = {name: data_store.dataset_info(name) for name in names}
+        except (ValueError, FileNotFoundError) as e:
+            return self.send_json(503, {"fehler": str(e)})
+
+        # Vor jedem Laden und Filtern: kennt der Client diese Antwort schon?
+        etag = make_etag(url.path, infos, params)
+        if etag in [tag.strip().removeprefix("W/") for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        try:
+            result = query(infos, params)
+        except QueryError as e:
+            return self.send_json(400, {"fehler": str(e)})
+        except (ValueError, FileNotFoundError) as e:
+            return self.send_json(503, {"fehler": str(e)})
+
+        if isinstance(result, dict):
+            return self.send_json(200, result, etag)
+        self.send_response(200)
+        self.send_header("Content-Type", FORMATS[fmt])
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for text in (iter_csv if fmt == "csv" else iter_json)(result):
+            data = text.encode("utf-8")
+            if data:
+                self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def send_json(self, status, body, etag=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", FORMATS["json"])
+        self.send_header("Content-Length", str(len(data)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nur lesende JSON/CSV-Abfrage der IK-Dashboard-Daten")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse (Standard: nur lokal)")
+    parser.add_argument("--port", type=int, default=PORT, help=f"Port (Standard: {PORT})")
+    args = parser.parse_args(argv)
+
+    try:
+        for name in data_store.SOURCES:
+            data_store.dataset_info(name)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"FEHLER: {e}", file=sys.stderr)
+        return 1
+    if REFRESH_SECONDS > 0:
+        # Meldungen des Hintergrund-Abgleichs (neue Versionen, fehlerhafte Lieferungen)
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+        data_store.start_watcher(REFRESH_SECONDS)
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(f"IK-Dashboard-API auf http://{args.host}:{args.port}/meta")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,205 +1,184 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import numpy as np
-import plotly.express as px
 import os
+import json
+import threading
+import time
+from concurrent.futures import wait
 from pathlib import Path
 
+import cache
+import dashboards
+import data_store
+import export
+import indicators
+import payload
+import prerender
+import timing
+from figures import (ANZEIGEARTEN, DEFAULT_ANZEIGEART, MONATS_ANZEIGEART,
+                     build_dashboard_figure, build_lag_figure, build_trade_figure,
+                     default_periods, default_years, filter_series, trade_y_axis)
+
 print("Aktuelles Arbeitsverzeichnis:", os.getcwd())
 print("Aktuelles Arbeitsverzeichnis:", Path.cwd())
 
+# Startzeit dieses Skriptlaufs (für die Laufzeitmessung am Ende)
+run_start = time.perf_counter()
+timing.start_run()
 
 
-def create_dashboard_plot(dashboard_name, selected_indicators, filtered_df):
-    if selected_indicators:
-        fig = go.Figure()
-        colors = ['#1f77b4', '#ff7f0e', '#2ca02c']
-
-        # Trennen der Indikatoren in normale und Index-Indikatoren
-        selected_normal = [ind for ind in selected_indicators if 'Index_' not in ind]
-        selected_index = [ind for ind in selected_indicators if 'Index_' in ind]
-
-        # Normale Indikatoren auf der linken Y-Achse (nur für Konjunktur/Arbeitsmarkt)
-        if dashboard_name == "Rohstoffe":
-            # Nur die Index-Indikatoren für das Rohstoffe-Dashboard anzeigen
-            for i, indicator in enumerate(selected_index):
-                fig.add_trace(go.Scatter(
-                    x=filtered_df['Zeitachse'],
-                    y=filtered_df[indicator],
-                    name=indicator,
-                    yaxis='y1',  # Alle Indikatoren auf der linken Y-Achse
-                    mode='lines+markers',
-                    line=dict(color=colors[i])
-                ))
-
-            # Layout für Rohstoffe (nur eine Y-Achse auf der linken Seite)
-            fig.update_layout(
-                title=f"Entwicklung ({dashboard_name})",
-                xaxis=dict(
-                    title="Zeitraum",
-                    #titlefont=dict(color="#000000"),
-                    tickfont=dict(color="#000000"),
-                    tickangle=45
-                ),
-                yaxis=dict(
-                    title="Index-Werte",  # Beschriftung der linken Y-Achse
-                    #titlefont=dict(color="#000000"),
-                    tickfont=dict(color="#000000"),
-                    tickformat=',',
-                    separatethousands=True,
-                    rangemode='tozero'
-                ),
-                height=400,
-                template="plotly_white",
-                showlegend=True,
-                margin=dict(l=40, r=40, t=40, b=80)
-            )
+# Figuren-Cache: Speicherbudget in MB und Lebensdauer in Sekunden (0 = unbegrenzt). Das
+# Budget begrenzt den Speicher auch bei sehr vielen verschiedenen Auswahlen (z.B. beliebige
+# Zeitraum-Kombinationen); innerhalb des Budgets fallen die am längsten ungenutzten Figuren
+# heraus. Veraltete Datenversionen entfernt invalidate_figures().
+FIGURE_CACHE_MB = float(os.environ.get("IK_DASHBOARD_FIGURE_CACHE_MB", "64"))
+FIGURE_CACHE_TTL = float(os.environ.get("IK_DASHBOARD_FIGURE_CACHE_TTL", "0"))
 
-        # Für das Dashboard "Index": Nur die Index-Indikatoren auf der rechten Y-Achse
-        elif dashboard_name == "Index":
-            for i, indicator in enumerate(selected_index):
-                fig.add_trace(go.Scatter(
-                    x=filtered_df['Zeitachse'],
-                    y=filtered_df[indicator],
-                    name=indicator,
-                    yaxis='y2',  # Index-Indikatoren auf der rechten Y-Achse
-                    mode='lines+markers',
-                    line=dict(color=colors[i])
-                ))
-
-            # Layout für Index-Dashboard (mit rechter Y-Achse)
-            fig.update_layout(
-                title=f"Entwicklung ({dashboard_name})",
-                xaxis=dict(
-                    title="Zeitraum",
-                    #titlefont=dict(color="#000000"),
-                    tickfont=dict(color="#000000"),
-                    tickangle=45
-                ),
-                yaxis=dict(
-                    title=None,  # Keine Beschriftung auf der linken Achse für Index-Dashboard
-                    #titlefont=dict(color="#000000"),
-                    tickfont=dict(color="#000000"),
-                    tickformat=',',
-                    separatethousands=True,
-                    rangemode='tozero'
-                ),
-                yaxis2=dict(
-                    title="Index-Wert",  # Index-Wert für die rechte Y-Achse
-                    #titlefont=dict(color="#000000"),
-                    tickfont=dict(color="#000000"),
-                    overlaying="y",
-                    side="right",
-                    type='linear',
-                    tickformat=',',
-                    separatethousands=True,
-                    rangemode='tozero'
-                ),
-                height=400,
-                template="plotly_white",
-                showlegend=True,
-                margin=dict(l=40, r=40, t=40, b=80)
-            )
 
-        # Für andere Dashboards (z.B. Konjunktur, Arbeitsmarkt)
-        else:
-            # Normale Indikatoren auf der linken Y-Achse
-            for i, indicator in enumerate(selected_normal):
-                fig.add_trace(go.Scatter(
-                    x=filtered_df['Zeitachse'],
-                    y=filtered_df[indicator],
-                    name=indicator,
-                    yaxis='y1',
-                    mode='lines+markers',
-                    line=dict(color=colors[i])
-                ))
-
-            # Index-Indikatoren auf der rechten Y-Achse (nur für Dashboards mit Index-Indikatoren)
-            for i, indicator in enumerate(selected_index):
-                fig.add_trace(go.Scatter(
-                    x=filtered_df['Zeitachse'],
-                    y=filtered_df[indicator],
-                    name=indicator,
-                    yaxis='y2',
-                    mode='lines+markers',
-                    line=dict(color=colors[i + len(selected_normal)])
-                ))
-
-            # Layout anpassen für alle anderen Dashboards
-            fig.update_layout(
-                title=f"Entwicklung ({dashboard_name})",
-                xaxis=dict(
-                    title="Zeitraum",
-                    #titlefont=dict(color="#000000"),
-                    tickfont=dict(color="#000000"),
-                    tickangle=45
-                ),
-                yaxis=dict(
-                    title="Absolute Werte (Nicht-Index Indikatoren)" if selected_normal else None,
-                    #titlefont=dict(color="#000000"),
-                    tickfont=dict(color="#000000"),
-                    tickformat=',',
-                    separatethousands=True,
-                    rangemode='tozero'
-                ),
-                yaxis2=dict(
-                    title="Index-Wert" if selected_index else None,
-                    #titlefont=dict(color="#000000"),
-                    tickfont=dict(color="#000000"),
-                    overlaying="y",
-                    side="right",
-                    type='linear',
-                    tickformat=',',
-                    separatethousands=True,
-                    rangemode='tozero'
-                ) if selected_index else None,
-                height=400,
-                template="plotly_white",
-                showlegend=True,
-                margin=dict(l=40, r=40, t=40, b=80)
-            )
+@st.cache_resource
+def get_figure_cache():
+    # Prozessweiter Cache für fertig serialisierte Plotly-Figuren (für alle Sitzungen)
+    return cache.LRUCache(maxsize=16384, max_bytes=int(FIGURE_CACHE_MB * 1024 * 1024) or None,
+                          ttl=FIGURE_CACHE_TTL or None, name="figuren")
 
-        # Plot anzeigen
-        st.plotly_chart(fig, use_container_width=True)
 
-        # Lesebeispiel einfügen
-        if dashboard_name == "Konjunktur":
-            st.markdown("""
-            ### Lesebeispiel:
+# Export-Cache: fertige Download-Dateien je Auswahl, Format und Datenversion (Budget in MB)
+EXPORT_CACHE_MB = float(os.environ.get("IK_DASHBOARD_EXPORT_CACHE_MB", "64"))
 
-            Die linke Y-Achse zeigt die Umsatzwerte in Euro, während die rechte Y-Achse die Indexwerte anzeigt. Nicht alle Indikatoren können historisch über den kompletten Zeitverlauf abgebildet werden.
 
-            **Was ist ein Indexwert?**
-            Ein Indexwert zeigt Veränderungen im Vergleich zu einem Basiszeitraum an. Bei den IK-Indizes zeigt ein positiver Wert eine Verbesserung, ein negativer Wert eine Verschlechterung der Situation im Vergleich zum Vorquartal an. Die IK-Indizes basieren auf den Einschätzungen der befragten Unternehmen und können Werte zwischen -100 und +100 annehmen. Je höher der absolute Wert, desto stärker ist der Konsens unter den Befragten. Beispielsweise würde ein IK-Index von +50 bedeuten, dass deutlich mehr Unternehmen eine Verbesserung als eine Verschlechterung erwarten, während ein Wert von -50 auf eine überwiegend negative Einschätzung hindeuten würde. Die Salden basieren auf folgender Rechnung: Anteil der Positivmeldungen minus Anteil der Negativmeldungen.
+@st.cache_resource
+def get_export_cache():
+    return cache.LRUCache(maxsize=1024, max_bytes=int(EXPORT_CACHE_MB * 1024 * 1024) or None, name="exporte")
 
-            **Interpretation der aktuellen Werte:**
-            Im vierten Quartal 2023 lag der Gesamtumsatz bei 5,8 Mio. Euro, wovon 2,7 Mio. Euro auf den Auslandsumsatz entfielen. Der Index für Exporte erreichte einen Wert von -43 Punkten, was auf eine deutlich pessimistischere Einschätzung der Exportentwicklung durch die befragten Unternehmen im Vergleich zum Vorquartal hindeutet. Diese negative Einschätzung hat sich in den Daten bestätigt: Die Exportzahlen zeigen einen Rückgang vom zweiten zum dritten Quartal 2023.
-            """)
-        elif dashboard_name == "Arbeitsmarkt":
-            st.markdown("""
-            ### Lesebeispiel:
 
-            Die linke Y-Achse zeigt die absoluten Werte der Beschäftigten und Betriebe, während die rechte Y-Achse die Indexwerte anzeigt. Nicht alle Indikatoren können historisch über den kompletten Zeitverlauf abgebildet werden.
+# Abgleich mit den Quelldateien in data/ im Hintergrund, alle n Sekunden
+# (0 = kein Hintergrund-Thread, dann wird in jedem Skriptlauf abgeglichen)
+REFRESH_SECONDS = float(os.environ.get("IK_DASHBOARD_REFRESH_SECONDS", "30"))
 
-            **Was ist ein Indexwert?**
-            Ein Indexwert zeigt Veränderungen im Vergleich zu einem Basiszeitraum an. Bei den IK-Indizes zeigt ein positiver Wert eine Verbesserung, ein negativer Wert eine Verschlechterung der Situation im Vergleich zum Vorquartal an. Die IK-Indizes basieren auf den Einschätzungen der befragten Unternehmen und können Werte zwischen -100 und +100 annehmen. Je höher der absolute Wert, desto stärker ist der Konsens unter den Befragten. Beispielsweise würde ein IK-Index von +50 bedeuten, dass deutlich mehr Unternehmen eine Verbesserung als eine Verschlechterung erwarten, während ein Wert von -50 auf eine überwiegend negative Einschätzung hindeuten würde. Die Salden basieren auf folgender Rechnung: Anteil der Positivmeldungen minus Anteil der Negativmeldungen.
-            
-            **Interpretation der aktuellen Werte:**
-            Im vierten Quartal 2023 lag die Anzahl der Beschäftigten bei 91.700 Personen. Der Index für die Beschäftigtenzahl liegt bei -32,6 Punkten, während der Index für die Wirtschaftslage bei -62,9 Punkten liegt. Dies deutet auf eine deutlich pessimistische Einschätzung sowohl der Beschäftigungsentwicklung als auch der allgemeinen Wirtschaftslage hin.
-            """)
-        elif dashboard_name == "Rohstoffe":
-            st.markdown("""
-            ### Lesebeispiel:
 
-            Die Y-Achse zeigt die verschiedenen Indexwerte an. Da es sich ausschließlich um Indizes handelt, wird nur eine Y-Achse benötigt. Nicht alle Indikatoren können historisch über den kompletten Zeitverlauf abgebildet werden.
+@st.cache_resource
+def start_data_refresh():
+    # Einmal pro Prozess: neue Lieferungen werden im Hintergrund übernommen und als neue
+    # Version atomar eingetauscht, ohne Neustart und ohne Einlesen im Skriptlauf. Bereits
+    # erzeugte statische Ansichten (prerender.py) werden danach neu geschrieben.
+    if REFRESH_SECONDS > 0:
+        return data_store.start_watcher(REFRESH_SECONDS, on_refresh=prerender.refresh_if_present)
+    return None
 
-            **Was ist ein Indexwert?**
-            Ein Indexwert zeigt Veränderungen im Vergleich zu einem Basiszeitraum an. Bei den HWWI-Indizes (Energierohstoffe, Rohöl, Kohle, Erdgas) zeigt ein höherer Wert steigende Preise an. Bei den IK-Indizes zeigt ein positiver Wert eine Verbesserung, ein negativer Wert eine Verschlechterung der Situation im Vergleich zum Vorquartal an. Die IK-Indizes basieren auf den Einschätzungen der befragten Unternehmen und können Werte zwischen -100 und +100 annehmen. Je höher der absolute Wert, desto stärker ist der Konsens unter den Befragten. Beispielsweise würde ein IK-Index von +50 bedeuten, dass deutlich mehr Unternehmen eine Verbesserung als eine Verschlechterung erwarten, während ein Wert von -50 auf eine überwiegend negative Einschätzung hindeuten würde.
-            
-            **Interpretation der aktuellen Werte:**
-            Im dritten Quartal 2022 erreichte der Index zur Preisentiwcklung der Energierohstoffe mit 718 Punkten einen historischen Höchststand. Diese extreme Preisentwicklung bei den Energierohstoffen spiegelt sich deutlich in den Einschätzungen der Unternehmen wider: Der Index für die Rohstoffverfügbarkeit liegt bei -17,4 Punkten, was auf Schwierigkeiten bei der Beschaffung hinweist. Besonders gravierend wirkt sich dies auf die Ertragslage aus, die mit einem Index von -76 Punkten einen sehr niedrigen Stand erreicht. Die außergewöhnlich hohen Energiepreise belasten die Unternehmen stark, da diese Kostensteigerungen nicht vollständig an die Kunden weitergegeben werden können.
-            """)
+
+@st.cache_resource
+def seen_versions():
+    # Zuletzt gesehene Datenversion je Datensatz (prozessweit)
+    return {"lock": threading.Lock(), "versions": {}}
+
+
+def current_dataset(name):
+    # Beschreibung der aktuellen Datenversion für diesen Skriptlauf. Der erste Lauf, der
+    # eine neue Version sieht, entfernt nur die davon betroffenen Figuren aus dem Cache.
+    # Läuft das Warm-up für diesen Datensatz noch, wird auf dessen Ergebnis gewartet.
+    future = start_warm_up()["futures"][name]
+    if not future.done():
+        with st.spinner("Daten werden vorbereitet ..."):
+            wait([future])
+    if start_data_refresh() is None:
+        info = data_store.refresh(name)
+    else:
+        info = data_store.dataset_info(name)
+    seen = seen_versions()
+    with seen["lock"]:
+        previous = seen["versions"].get(name)
+        seen["versions"][name] = info["version"]
+    if previous is not None and previous != info["version"]:
+        invalidate_figures(name, previous, info)
+    return info
+
+
+def invalidate_figures(name, old_version, info):
+    # Figuren- und Export-Schlüssel beginnen mit (Datensatz, Version, Quartale, ...). Figuren der alten
+    # Version, deren Quartale sich nicht geändert haben, gelten unter der neuen Version
+    # weiter. Ist die Änderung unbekannt (Neuaufbau, übersprungene Version), wird alles
+    # dieses Datensatzes verworfen.
+    changed = None
+    if info.get("vorherige_version") == old_version:
+        changed = set(info["geaenderte_quartale"])
+
+    def update(key):
+        if key[:2] != (name, old_version):
+            return key
+        if changed is None or changed.intersection(key[2]):
+            return None
+        return (name, info["version"]) + key[2:]
+
+    get_figure_cache().rekey(update)
+    get_export_cache().rekey(update)
+
+
+def cached_figure(key, build_figure, label):
+    # Schlüssel = normalisierte Auswahl + Datenversion. Nur bei einem Fehlschlag wird
+    # die Figur Trace für Trace aufgebaut; gespeichert wird das fertige, kompakte JSON
+    # (gekürztes Template, Binär-Arrays, siehe payload.py).
+    def build():
+        with timing.span(f"Figur aufbauen ({label})"):
+            spec = build_figure().to_json()
+        with timing.span(f"Figur kompaktieren ({label})"):
+            return payload.compact(spec, label)
+
+    spec = get_figure_cache().get_or_create(key, build)
+    return json.loads(spec)
+
+
+def download_buttons(key, rows, file_name, label):
+    # Ein Download-Button je Format für den angezeigten Ausschnitt. Die Datei entsteht erst
+    # beim Klick (in einem eigenen Thread, ohne Rerun) und liegt danach im Export-Cache;
+    # rows() liefert die Zeilen, key ist der Figuren-Schlüssel ohne reine Darstellungsoptionen.
+    exports = get_export_cache()
+    for column, (fmt, (extension, mime, _)) in zip(st.columns(len(export.FORMATS)), export.FORMATS.items()):
+        def data(fmt=fmt):
+            return exports.get_or_create(key + ("export", fmt), lambda: export.export_bytes(rows(), fmt))
+        with column:
+            st.download_button(f"{fmt} herunterladen", data=data, file_name=f"{file_name}.{extension}",
+                               mime=mime, key=f"export_{label}_{fmt}", on_click="ignore")
+
+
+def create_dashboard_plot(dashboard_name, selected_indicators, filtered_df, figure_key=(), umrechnung=None):
+    if selected_indicators:
+        plotted = selected_indicators
+        label = None
+        if umrechnung:
+            # Abgeleitete Spalten (einmal pro Datenversion vorberechnet, siehe indicators.py);
+            # Indikatoren ohne diese Umrechnung (Salden der IK-Umfrage) bleiben im Original
+            label = indicators.UMRECHNUNGEN[umrechnung][0]
+            plotted = [
+                indicators.column_name(ind, umrechnung)
+                if indicators.column_name(ind, umrechnung) in filtered_df.columns else ind
+                for ind in selected_indicators
+            ]
+            unchanged = [ind for ind, column in zip(selected_indicators, plotted) if ind == column]
+            if unchanged:
+                st.caption(f"Ohne Umrechnung dargestellt (Salden der IK-Umfrage): {', '.join(unchanged)}")
+            # Abgeleitete Werte hängen auch von Quartalen vor bzw. außerhalb der Auswahl ab
+            if figure_key:
+                figure_key = figure_key[:2] + (indicators.dependent_quarters(umrechnung, figure_key[2]),) + figure_key[3:]
+        key = figure_key + ("dashboard", dashboard_name, tuple(plotted)) + ((umrechnung,) if umrechnung else ())
+        with timing.span(f"create_dashboard_plot ({dashboard_name})"):
+            fig = cached_figure(
+                key,
+                lambda: build_dashboard_figure(dashboard_name, selected_indicators, filtered_df, label, plotted),
+                dashboard_name
+            )
+
+        # Plot anzeigen
+        with timing.span(f"st.plotly_chart ({dashboard_name})"):
+            st.plotly_chart(fig, use_container_width=True)
+
+        # Daten des Diagramms (gezeigte Quartale und Indikatoren) zum Herunterladen
+        download_buttons(key, lambda: export.view_rows(filtered_df, plotted),
+                         prerender.slug(dashboard_name + (f" {umrechnung}" if umrechnung else "")), dashboard_name)
+
+        # Lesebeispiel einfügen
+        lesebeispiel = dashboards.DASHBOARDS[dashboard_name].get("lesebeispiel")
+        if lesebeispiel:
+            st.markdown(lesebeispiel)
 
         # Statistiken als ausklappbares Element
         #with st.expander(f"Statistiken ({dashboard_name})"):
@@ -209,12 +188,88 @@ def create_dashboard_plot(dashboard_name, selected_indicators, filtered_df):
     else:
         st.info(f"Bitte Indikatoren für {dashboard_name} auswählen")
 
+
+# Jedes Dashboard ist ein eigenständig neu ausführbarer Abschnitt: eine Änderung der
+# Indikatorauswahl führt nur diesen Abschnitt erneut aus, nicht die ganze Seite
+@st.fragment
+def dashboard_section(dashboard_name, options, default, filtered_df, figure_key):
+    selected_indicators = st.multiselect(
+        f"Indikatoren für {dashboard_name}:",
+        options=options,
+        default=default,
+        max_selections=dashboards.MAX_SELECTIONS
+    )
+    # Darstellung: Originalwerte oder abgeleitete Indikatoren
+    umrechnung = st.selectbox(
+        f"Darstellung für {dashboard_name}:",
+        options=[None] + list(indicators.UMRECHNUNGEN),
+        format_func=lambda kind: "Originalwerte" if kind is None else indicators.UMRECHNUNGEN[kind][0],
+        key=f"umrechnung_{dashboard_name}"
+    )
+    create_dashboard_plot(dashboard_name, selected_indicators, filtered_df, figure_key, umrechnung)
+
+
+# Vorlauf-Analyse: wie stark läuft ein Indikator einem anderen voraus? Die Korrelationen
+# aller Paare und Vorläufe liegen vorberechnet vor, hier wird nur ausgewählt.
+@st.fragment
+def vorlauf_section(options, lag_index, best_lags, figure_key):
+    # Voreinstellung Index_Exporte -> Auslandsumsatz; fehlt eine der Reihen in der Lieferung,
+    # steht die Auswahl auf dem ersten bzw. zweiten Indikator
+    def default_index(indicator, fallback):
+        return options.index(indicator) if indicator in options else min(fallback, len(options) - 1)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        frueh = st.selectbox("Frühindikator:", options=options,
+                             index=default_index("Index_Exporte", 0), key="vorlauf_frueh")
+    with col2:
+        ziel = st.selectbox("Zielgröße:", options=options,
+                            index=default_index("Auslandsumsatz", 1), key="vorlauf_ziel")
+    if frueh == ziel:
+        st.info("Bitte zwei verschiedene Indikatoren auswählen")
+        return
+
+    serie = lag_index.get((frueh, ziel))
+    if serie is None:
+        # Reihe fehlt im Datensatz oder ist zu kurz für eine Korrelation
+        st.info(f"Für {frueh} und {ziel} liegen keine Korrelationen vor")
+        return
+    fig = cached_figure(
+        figure_key + ("vorlauf", frueh, ziel),
+        lambda: build_lag_figure(serie, frueh, ziel),
+        "Vorlauf-Analyse"
+    )
+    with timing.span("st.plotly_chart (Vorlauf-Analyse)"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    # Stärkste vorauslaufende Indizes (IK-Umfrage, HWWI) für die gewählte Zielgröße
+    best = best_lags[(best_lags["Zielgröße"] == ziel) & best_lags["Frühindikator"].isin(options)
+                     & best_lags["Frühindikator"].str.startswith("Index_")]
+    st.markdown(f"**Stärkste Frühindikatoren für {ziel}** (Indizes, 1 bis {indicators.MAX_LAG} Quartale Vorlauf)")
+    st.dataframe(best.head(5)[["Frühindikator", "Vorlauf", "Korrelation"]], hide_index=True)
+
+
+def lazy_section(label, key):
+    # Im Lazy-Modus liegt jedes Dashboard in einem eingeklappten Abschnitt, dessen
+    # Inhalt (Datenaufbereitung und Figur) erst ausgeführt wird, wenn er geöffnet ist.
+    # Ohne Lazy-Modus wird wie bisher alles direkt dargestellt.
+    if not lazy_mode:
+        return st.container(), True
+    section = st.expander(label, expanded=False, key=key, on_change="rerun")
+    return section, section.open
+
 # Seitenkonfiguration
 st.set_page_config(
     page_title="Dashboard: IK Wirtschaftsstatistik",
     layout="wide"
 )
 
+# Lazy-Modus per Umgebungsvariable (IK_DASHBOARD_LAZY=1) oder Query-Parameter (?lazy=1)
+lazy_mode = os.environ.get("IK_DASHBOARD_LAZY") == "1" or st.query_params.get("lazy") == "1"
+
+# Debug-Panel mit Laufzeiten per Umgebungsvariable (IK_DASHBOARD_DEBUG=1) oder Query-Parameter (?debug=1)
+debug_mode = os.environ.get("IK_DASHBOARD_DEBUG") == "1" or st.query_params.get("debug") == "1"
+
 # Logo und Styling hinzufügen
 st.markdown("""
     <style>
@@ -287,39 +342,140 @@ st.markdown("""
     <div class="banner-container">
     Ein Dashboard ist ein interaktives Visualisierungstool, das komplexe Daten übersichtlich darstellt und wichtige Entwicklungen der Branche auf einen Blick erfassbar macht. Die IK stellt diese Informationen transparent zur Verfügung, um Mitgliedsunternehmen, Medienvertreter und die Öffentlichkeit über die wirtschaftliche Entwicklung der Kunststoffverpackungs- und folienindustrie zu informieren. Erkunden Sie die Daten und gewinnen Sie spannende Einblicke in unsere Branche!
 """, unsafe_allow_html=True)
+# Konjunktur-/HWWI-Daten einlesen (einmal pro Dateiversion, für alle Sitzungen geteilt)
+
+# Die Datensätze liegen einmal pro Prozess im Speicher (cache_resource statt cache_data,
+# das jeder Sitzung bei jedem Lauf eine eigene Kopie liefert) und werden nur gelesen.
+# Pro Sitzung entstehen nur die kleinen Ausschnitte der aktuellen Auswahl; dank
+# Copy-on-Write (siehe data_store.py) verändert keine Sitzung die gemeinsamen Daten.
+# Ohne eigenen Spinner: die Loader laufen beim Start im Warm-up-Thread (ohne Sitzung),
+# wartende Sitzungen sehen stattdessen "Daten werden vorbereitet ...".
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_konjunktur_base(info):
+    # Nur Jahr und Quartal aller Zeilen: Zeitraum-Filter und Quartalsachse der Vorlauf-Analyse
+    # (die Version in `info` dient als Cache-Schlüssel; nur lesend verwenden!)
+    with timing.span("Datensatz lesen (Zeitachse)"):
+        return data_store.read_dataset(info, columns=["Jahr", "Monat"])
+
+@st.cache_resource(max_entries=2 * len(dashboards.DASHBOARDS), show_spinner=False)
+def load_dashboard_data(info, dashboard_name):
+    # Liest aus dem fertig aufbereiteten Datensatz (siehe ingest.py: Jahr als int, Sortierung
+    # und Zeitachse sind schon gesetzt) nur die Spalten dieses Dashboards (dashboards.py) und
+    # ihre abgeleiteten Indikatoren (zeilengleich vorberechnet). Erst aufgerufen, wenn der
+    # Abschnitt angezeigt wird; ein DataFrame je Dashboard und Datenversion für alle
+    # Sitzungen (nur lesend verwenden!)
+    with timing.span(f"Datensatz lesen ({dashboard_name})"):
+        columns = dashboards.columns(dashboard_name, data_store.table_columns(data_store.dataset_path(info)))
+        df = data_store.read_dataset(info, columns=columns)
+        if "indikatoren" in info["derived"]:
+            available = data_store.table_columns(data_store.derived_path(info, "indikatoren"))
+            derived = data_store.read_derived(info, "indikatoren", dashboards.derived_columns(dashboard_name, available))
+            df = pd.concat([df, derived], axis=1)
+    return df
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_lag_correlations(info):
+    # Kreuzkorrelationen aller Indikatorpaare je Vorlauf (beim Aufbereiten berechnet):
+    # (Frühindikator, Zielgröße) -> Korrelation je Vorlauf, dazu je Paar der stärkste
+    # Zusammenhang mit echtem Vorlauf (nur lesend verwenden!)
+    with timing.span("Korrelationen lesen"):
+        table = data_store.read_derived(info, "korrelation")
+    lag_index = {key: group.sort_values("Vorlauf")
+                 for key, group in table.groupby(["Frühindikator", "Zielgröße"], sort=False)}
+    leading = table[(table["Vorlauf"] > 0) & table["Korrelation"].notna()]
+    best = leading.loc[leading["Korrelation"].abs().groupby([leading["Frühindikator"], leading["Zielgröße"]]).idxmax()]
+    best = best.iloc[best["Korrelation"].abs().argsort()[::-1]].reset_index(drop=True)
+    return lag_index, best
+
+# Außenhandel-Daten (Quelldateien siehe data_store.SOURCES)
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_data(info):
+    # Liest nur die Quartalswerte in Tsd. EUR und nur die Spalten, die das Diagramm
+    # braucht, batchweise aus dem aufbereiteten Datensatz. Monats-, TOTAL- und Anzahl-Zeilen
+    # werden schon beim Lesen verworfen; Spalten sind bereits umbenannt und numerisch.
+    # Das Jahresfenster wird beim Aufbereiten aus den Daten abgeleitet. Ein gemeinsamer
+    # DataFrame für alle Sitzungen (nur lesend verwenden!)
+    with timing.span("CSV-Aufbereitung (Quartale, Tsd. EUR)"):
+        df = data_store.load_quarterly(info)
+    return df
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_series_index(info):
+    # Vorsortierte Reihen je (Handelsrichtung, Polymerart/Packmittel), einmal pro
+    # Datenversion für alle Sitzungen aufgebaut (nur lesend verwenden!)
+    return data_store.build_series_index(load_data(info))
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_cube_index(info):
+    # Drill-down-Würfel (Quartale/Monate, Gesamt/Warennummern), beim Aufbereiten einmal
+    # pro Datenversion vorberechnet und hier für alle Sitzungen indiziert (nur lesend!)
+    with timing.span("Würfel lesen"):
+        cube = data_store.read_derived(info, "cube")
+    return data_store.build_cube_index(cube)
+
+
+# Warm-up: beim ersten Skriptlauf nach dem (Neu-)Start werden beide Datensätze gleichzeitig
+# im Hintergrund abgeglichen, eingelesen und in die gemeinsamen Caches geladen, während die
+# Seite schon aufgebaut wird. Sitzungen, die währenddessen kommen, warten auf dasselbe
+# Ergebnis, statt die Dateien ein zweites Mal einzulesen (siehe current_dataset).
+def prepare_dataset(info):
+    # Die Dashboards selbst werden nur vorgeladen, wenn sie auch sofort angezeigt werden
+    # (ohne Lazy-Modus); im Lazy-Modus erst beim Öffnen des Abschnitts
+    with timing.span(f"Warm-up laden ({info['name']})"):
+        if info["name"] == "konjunktur":
+            load_konjunktur_base(info)
+            load_lag_correlations(info)
+        else:
+            load_series_index(info)
+            load_cube_index(info)
+        if os.environ.get("IK_DASHBOARD_LAZY") != "1":
+            for dashboard_name, dashboard in dashboards.DASHBOARDS.items():
+                if dashboard["quelle"] == info["name"]:
+                    load_dashboard_data(info, dashboard_name)
+
+@st.cache_resource
+def start_warm_up():
+    # Einmal pro Prozess; "dauer" = Sekunden vom Start bis der Datensatz bereit ist
+    start = time.perf_counter()
+    futures = data_store.warm_up(prepare=prepare_dataset)
+    dauer = {}
+    for name, future in futures.items():
+        future.add_done_callback(lambda _, name=name: dauer.setdefault(name, round(time.perf_counter() - start, 3)))
+    return {"futures": futures, "dauer": dauer}
+
+def warm_up_status():
+    # Bereitschaft je Datensatz (Debug-Panel); "bereit", sobald alles im Speicher liegt
+    warm_up = start_warm_up()
+    status = {}
+    for name, future in warm_up["futures"].items():
+        if not future.done():
+            status[name] = "läuft"
+        elif future.exception() is not None:
+            status[name] = f"Fehler: {future.exception()}"
+        else:
+            status[name] = "bereit"
+    return {"bereit": all(value == "bereit" for value in status.values()), **status, "dauer_s": warm_up["dauer"]}
+
+start_warm_up()
+
 try:
-    # Daten einlesen
-    df = pd.read_excel(r'data/IK_Konj+Destatis_HWWI.xlsx')
-
-    # Dashboard-Definitionen
-    dashboards = {
-        "Konjunktur": ["Umsatz", "Auslandsumsatz", "Auslandsumsatz mit der Eurozone",
-                       "Auslandsumsatz mit dem sonstigen Ausland", "Index_Ertrag",
-                       "Index_Exporte", "Index_Wirtschaftslage", "Index_Absatz"], #"Index_Umsatz", "Index_Verkaufspreise (Branchenprodukte)"
-        "Arbeitsmarkt": ["Betriebe", "Beschäftigte", "Index_Beschäftigtenzahl",
-                         "Index_Wirtschaftslage"],
-        "Rohstoffe": ["Index_Rohstoffverfügbarkeit", "Index_Preisentwicklung Energierohstoffe",
-                      "Index_Preisentwicklung Kohle", "Index_Preisentwicklung Rohöl", "Index_Preisentwicklung Erdgas",
-                      "Index_Ertrag"] #"Index_Verkaufspreise (Branchenprodukte)"
-    }
+    # Daten einlesen (aktuelle Version; neue Arbeitsmappen übernimmt der Hintergrund-Abgleich)
+    with timing.span("Datenversion prüfen (Konjunktur)"):
+        konj_info = current_dataset("konjunktur")
+    with timing.span("load_konjunktur_base"):
+        df = load_konjunktur_base(konj_info)
 
     # Zeitraum-Filter als ausklappbares Element im Hauptbereich
     with st.expander("Zeitraum-Filter", expanded=False):  # Der Zeitraum-Filter ist zu Beginn eingeklappt
         st.header("Zeitraum-Filter")
 
-        # Stelle sicher, dass alle Jahre den gleichen Datentyp haben (int)
-        df['Jahr'] = df['Jahr'].astype(int)
-
         # Alle verfügbaren Jahre
         years = sorted(df['Jahr'].unique().tolist())
 
-        # Standardmäßig nur Jahre ab 2019 vorauswählen
-        default_years = [year for year in years if year >= 2019]
-
         selected_years = st.multiselect(
             "Jahre auswählen:",
             options=years,
-            default=default_years  # Nur Jahre ab 2019 vorausgewählt
+            default=default_years(years)  # Nur Jahre ab 2019 vorausgewählt
         )
 
         quarters = ['Q1', 'Q2', 'Q3', 'Q4']
@@ -329,99 +485,68 @@ try:
             default=quarters
         )
 
-    # Daten filtern
-    filtered_df = df[
-        (df['Jahr'].isin(selected_years)) &
-        (df['Monat'].isin(selected_quarters))
-        ]
-
-    # Sortierung und Zeitachse
-    quartal_order = {'Q1': 1, 'Q2': 2, 'Q3': 3, 'Q4': 4}
-    filtered_df['Quartal_Sortierung'] = filtered_df['Monat'].map(quartal_order)
-    filtered_df = filtered_df.sort_values(by=['Jahr', 'Quartal_Sortierung'])
-    filtered_df['Zeitachse'] = filtered_df['Jahr'].astype(str) + '-' + filtered_df['Monat']
-    #filtered_df = filtered_df[filtered_df['Jahr'] >= 2019]
-
-    # Konjunktur Dashboard
-    st.header("Konjunktur")
-    with st.expander("ℹ️ Über dieses Dashboard"):
-        st.markdown("""
-            Dieses Dashboard zeigt zwei Arten von Daten für die deutsche Kunststoffverpackungs- und Folienindustrie:
-
-            **1. Offizielle Statistiken (Destatis):**
-            - Umsatz (in Euro)
-            - Auslandsumsatz gesamt (in Euro)
-            - Auslandsumsatz mit der Eurozone (in Euro)
-            - Auslandsumsatz mit dem sonstigen Ausland (in Euro)
-
-            **2. IK-Konjunkturumfrage (Quartalsdaten), berichtet über die Geschäftserwartungen:**
-            - Index_Ertrag
-            - Index_Exporte
-            - Index_Wirtschaftslage
-            - Index_Absatz
-    
-            ➡️ Alle Daten beziehen sich ausschließlich auf die Kunststoffverpackungs- und Folienindustrie in Deutschland.
-            """)
-
-    selected_indicators_konj = st.multiselect(
-        "Indikatoren für Konjunktur:",
-        options=dashboards["Konjunktur"],
-        default=["Umsatz", "Auslandsumsatz", "Index_Exporte"],
-        max_selections=3
-    )
-    create_dashboard_plot("Konjunktur", selected_indicators_konj, filtered_df)
-    st.markdown("---")
-
-    # Arbeitsmarkt Dashboard
-    st.header("Arbeitsmarkt")
-    with st.expander("ℹ️ Über dieses Dashboard"):
-        st.markdown("""
-            Dieses Dashboard zeigt zwei Arten von Daten für die deutsche Kunststoffverpackungs- und Folienindustrie:
-
-            **1. Offizielle Statistiken (Destatis):**
-            - Betriebe (Anzahl)
-            - Beschäftigte (Anzahl)
-
-            **2. IK-Konjunkturumfrage (Quartalsdaten), berichtet über die Geschäftserwartungen:**
-            - Index_Beschäftigtenzahl
-            - Index_Wirtschaftslage
-
-            ➡️ Alle Daten beziehen sich ausschließlich auf die Kunststoffverpackungs- und Folienindustrie in Deutschland.
+    # Gewählte Quartale als Periodenschlüssel (Teil der Figuren-Schlüssel, damit bei neuen
+    # Daten nur betroffene Figuren verfallen)
+    selected_periods = tuple(sorted(
+        data_store.period_key(year, data_store.QUARTALE[quarter])
+        for year in selected_years for quarter in selected_quarters
+    ))
+    konj_figure_key = ("konjunktur", konj_info["version"], selected_periods)
+    # Die Vorlauf-Analyse nutzt immer den ganzen Zeitraum
+    konj_all_quarters = tuple(sorted(
+        data_store.period_key(year, data_store.QUARTALE[quarter])
+        for year, quarter in zip(df["Jahr"], df["Monat"])
+    ))
+
+    # Dashboards aus der Registry (dashboards.py), in deren Reihenfolge. Daten werden je
+    # Dashboard erst gelesen, wenn sein Abschnitt angezeigt wird, und nur dessen Spalten.
+    infos = {"konjunktur": konj_info}
+    for dashboard_name, dashboard in dashboards.DASHBOARDS.items():
+        st.header(dashboard_name)
+        with st.expander("ℹ️ Über dieses Dashboard"):
+            st.markdown(dashboard["info"])
+
+        section, section_open = lazy_section(f"{dashboard_name} anzeigen", dashboards.lazy_key(dashboard_name))
+        if section_open:
+            if dashboard["quelle"] not in infos:
+                infos[dashboard["quelle"]] = current_dataset(dashboard["quelle"])
+            info = infos[dashboard["quelle"]]
+            with timing.span(f"load_dashboard_data ({dashboard_name})"):
+                dashboard_df = load_dashboard_data(info, dashboard_name)
+
+            # Daten filtern (Sortierung und Zeitachse sind bereits beim Laden gesetzt); der
+            # Ausschnitt gehört der Sitzung, der gemeinsame Datensatz bleibt unverändert
+            with timing.span(f"Filtern ({dashboard_name})"):
+                filtered_df = dashboard_df[
+                    (dashboard_df['Jahr'].isin(selected_years)) &
+                    (dashboard_df['Monat'].isin(selected_quarters))
+                    ]
+
+            with section:
+                dashboard_section(dashboard_name, dashboards.indicator_options(dashboard_name),
+                                  dashboard["standard"], filtered_df,
+                                  (dashboard["quelle"], info["version"], selected_periods))
+        st.markdown("---")
+
+    # Vorlauf-Analyse
+    st.header("Vorlauf-Analyse")
+    with st.expander("ℹ️ Über diese Analyse"):
+        st.markdown(f"""
+            Die Vorlauf-Analyse zeigt, wie eng ein Indikator mit einem anderen zusammenhängt, wenn er diesem um einige Quartale vorausläuft, z.B. ob die Einschätzung der Exporte in der IK-Konjunkturumfrage (Index_Exporte) die spätere Entwicklung des Auslandsumsatzes vorwegnimmt.
+
+            - **Vorlauf > 0:** Der Frühindikator wird mit der Zielgröße so viele Quartale später verglichen.
+            - **Korrelation:** +1 bedeutet einen perfekten gleichläufigen, -1 einen perfekten gegenläufigen Zusammenhang, Werte nahe 0 keinen linearen Zusammenhang.
+            - Umsätze, Beschäftigte und HWWI-Preisindizes gehen mit ihrer Veränderung zum Vorjahresquartal ein, die Salden der IK-Umfrage direkt. Betrachtet wird der gesamte verfügbare Zeitraum.
+
+            ➡️ Eine hohe Korrelation ist ein Hinweis auf einen Zusammenhang, aber kein Beleg für eine Ursache; bei {len(konj_all_quarters)} Quartalen sind die Werte mit Vorsicht zu interpretieren.
             """)
-    selected_indicators_arb = st.multiselect(
-        "Indikatoren für Arbeitsmarkt:",
-        options=dashboards["Arbeitsmarkt"],
-        default=["Beschäftigte", "Index_Beschäftigtenzahl", "Index_Wirtschaftslage"],
-        max_selections=3
-    )
-    create_dashboard_plot("Arbeitsmarkt", selected_indicators_arb, filtered_df)
-    st.markdown("---")
-
-    # Rohstoffe Dashboard
-    st.header("Rohstoffe")
-    with st.expander("ℹ️ Über dieses Dashboard"):
-        st.markdown("""
-            Dieses Dashboard zeigt zwei Arten von Daten:
-
-            **1. Offizielle Statistiken (HWWI):**
-            - Index_Preisentwicklung Energierohstoffe
-            - Index_Preisentwicklung Kohle
-            - Index_Preisentwicklung Rohöl
-            - Index_Preisentwicklung Erdgas
-
-            **2. IK-Konjunkturumfrage (Quartalsdaten), berichtet über die Geschäftserwartungen:**
-            - Index_Ertrag
-            - Index_Rohstoffverfügbarkeit
-
-            ➡️ Alle Daten des HWWI beziehen sich auf Deutschland insgesamt, Daten der IK-Konjunkturumfrage beziehen sich auf die Branche der Kunststoffverpackungs- und Folienindustrie in Deutschland.
-            """)
-    selected_indicators_roh = st.multiselect(
-        "Indikatoren für Rohstoffe:",
-        options=dashboards["Rohstoffe"],
-        default=["Index_Preisentwicklung Energierohstoffe", "Index_Ertrag", "Index_Rohstoffverfügbarkeit"],
-        max_selections=3
-    )
-    create_dashboard_plot("Rohstoffe", selected_indicators_roh, filtered_df)
+    section, section_open = lazy_section("Vorlauf-Analyse anzeigen", "lazy_vorlauf")
+    if section_open:
+        with section:
+            with timing.span("load_lag_correlations"):
+                lag_index, best_lags = load_lag_correlations(konj_info)
+            vorlauf_options = dashboards.all_indicators()
+            vorlauf_section(vorlauf_options, lag_index, best_lags, konj_figure_key[:2] + (konj_all_quarters,))
 
     # Add after the last dashboard section but before the except statement
     st.markdown("---")
@@ -440,161 +565,139 @@ with st.expander("ℹ️ Über dieses Dashboard"):
     """)
 
 
-# Lade CSV-Datei
-#csv_path = r"C:\Users\l.mueller\Documents\FileCloud\Team Folders\IK_Server\Wirtschaft\statistische Daten\ik-dashboard\data\Destatis_Außenhandelsstatstik_Monate_Quartale_Jahre.csv"
-csv_path = r'data/Destatis_Außenhandelsstatstik_Monate_Quartale_Jahre.csv'
-
-@st.cache_data
-def load_data(path):
-    df = pd.read_csv(path, sep=';', encoding='latin1', decimal=',')
-    return df
-
-# Daten laden und Fehlerbehandlung
-try:
-    df = load_data(csv_path)
-except FileNotFoundError:
-    st.error("CSV-Datei wurde nicht gefunden. Bitte überprüfe den Pfad.")
-    st.stop()
-
-# Filter auf Quartalsdaten mit Format "YYYY-Qx"
-df = df[df["Jahr-Monat"].str.contains(r"\d{4}-Q\d", na=False)]
-
-# Nur Maßeinheit "Tsd. EUR"
-df = df[df["Maßeinheit"] == "Tsd. EUR"]
-
-# Umbenennung der Spalte für bessere Lesbarkeit
-df = df.rename(columns={
-    "relative Veränderung zum Vorjahr/Vorjahresmonat/Vorjahresquartal": "prozentuale Veränderung zum Vorjahresquartal"
-})
-
-df = df.rename(columns={
-    "Kennzahl": "Tsd. EUR"
-})
-
-df = df.drop(columns=["Maßeinheit"])
-
-
-# Konvertiere die Spalten in numerische Werte (falls noch nicht automatisch geschehen)
-df["prozentuale Veränderung zum Vorjahresquartal"] = pd.to_numeric(df["prozentuale Veränderung zum Vorjahresquartal"], errors='coerce')
-df["Tsd. EUR"] = pd.to_numeric(df["Tsd. EUR"], errors='coerce')
-
-# Filter: Nur Jahre 2016 bis 2025
-df = df[df["Jahr-Monat"].str[:4].astype(int).between(2016, 2025)] #anpassen wenn neue Daten vorliegen
-
-# Dropdown-Menü zur Auswahl der Anzeigeart
-anzeigeart = st.radio(
-    "Wähle die Anzeigeart:",
-    options=["Prozentuale Veränderung zum Vorjahresquartal", "Absolute Quartalsentwicklung (Tsd. EUR)"],
-    index=1  # Standardmäßig ist die asolute Quartalsentwicklung ausgewählt
-)
-
-def calculate_dynamic_y_range(max_value):
-    # Dynamische Schrittweiten und Obergrenzen für verschiedene Größenordnungen
-    if max_value <= 1000:
-        y_max = int(np.ceil(max_value / 100.0)) * 100  # Schritte zu 100
-        y_max = max(y_max, 1000)  # Mindest-y_max für Sichtbarkeit
-    elif max_value <= 10000:
-        y_max = int(np.ceil(max_value / 1000.0)) * 1000  # Schritte zu 1.000
-    elif max_value <= 100000:
-        y_max = int(np.ceil(max_value / 10000.0)) * 10000  # Schritte zu 10.000
-    else:
-        y_max = int(np.ceil(max_value / 100000.0)) * 100000  # Schritte zu 100.000
-    return y_max
-
-# User-Filter: Handelsrichtung (Einfuhr/Ausfuhr)
-richtung = st.selectbox(
-    "Auswahl Handelsrichtung:",
-    options=df["Import/Export"].dropna().unique(),
-    key="direction_filter"  # Eindeutiger Schlüssel
-)
+# Außenhandel als eigenständig neu ausführbarer Abschnitt: Änderungen an Anzeigeart,
+# Handelsrichtung, Polymerart oder Zeiträumen führen nur diesen Teil erneut aus
+@st.fragment
+def aussenhandel_section(df, series_index, cube_index, trade_info):
+    # Dropdown-Menü zur Auswahl der Anzeigeart
+    anzeigeart = st.radio(
+        "Wähle die Anzeigeart:",
+        options=ANZEIGEARTEN,
+        index=DEFAULT_ANZEIGEART  # Standardmäßig ist die asolute Quartalsentwicklung ausgewählt
+    )
 
-# User-Filter: Polymerart / Packmittel
-packmittel = st.selectbox(
-    "Auswahl Polymerart / Packmittel:",
-    options=df["Polymerart/Packmittel"].dropna().unique(),
-    key="polymer_filter"  # Eindeutiger Schlüssel
-)
+    # User-Filter: Handelsrichtung (Einfuhr/Ausfuhr)
+    richtung = st.selectbox(
+        "Auswahl Handelsrichtung:",
+        options=df["Import/Export"].dropna().unique(),
+        key="direction_filter"  # Eindeutiger Schlüssel
+    )
 
-# Alle verfügbaren Zeiträume (z.B. '2016-Q1', ..., '2025-Q4')
-zeitraeume = sorted(df["Jahr-Monat"].unique().tolist())
+    # User-Filter: Polymerart / Packmittel
+    packmittel = st.selectbox(
+        "Auswahl Polymerart / Packmittel:",
+        options=df["Polymerart/Packmittel"].dropna().unique(),
+        key="polymer_filter"  # Eindeutiger Schlüssel
+    )
 
-# Nur Zeiträume ab 2019 bis einschließlich 2025-Q3 # Zeiträume anpassen
-default_zeitraeume = [
-    z for z in zeitraeume
-    if (
-        (2019 <= int(z[:4]) < 2025)  # Jahre 2019 bis 2024
-        or (z in ['2025-Q1', '2025-Q2', '2025-Q3'])  # Explizit Q1, Q2, Q3 von 2025
+    # Drill-down: Monatswerte statt Quartalen, Gesamt-Aggregate nach Warennummern aufgeschlüsselt
+    aufloesung = st.radio(
+        "Zeitliche Auflösung:",
+        options=["Quartale", "Monate"],
+        horizontal=True,
+        key="aufloesung"
     )
-]
+    hierarchie = trade_info["hierarchie"]
+    aufschluesseln = False
+    if packmittel in hierarchie:
+        aufschluesseln = st.checkbox(f"{packmittel} nach Warennummern aufschlüsseln", key="drilldown")
+
+    # Alle verfügbaren Zeiträume als Periodenschlüssel (angezeigt als '2016-Q1', ..., '2025-Q4')
+    zeitraeume = sorted(df["Periode"].unique().tolist())
+
+    # Nur Zeiträume ab 2019 bis einschließlich zum letzten gemeldeten Quartal
+    default_zeitraeume = default_periods(zeitraeume, trade_info["quartale"][1])
+
+
+    # Multiselect-Dropdown für Zeiträume in einem eingeklappten Expander
+    with st.expander("Zeiträume auswählen", expanded=False):
+        selected_zeitraeume = st.multiselect(
+            "Zeiträume auswählen:",
+            options=zeitraeume,
+            default=default_zeitraeume,
+            format_func=data_store.period_label,
+            key="zeitraeume_dropdown"
+        )
 
+    prozentual = anzeigeart == ANZEIGEARTEN[0]
+    figure_options = {}
 
-# Multiselect-Dropdown für Zeiträume in einem eingeklappten Expander
-with st.expander("Zeiträume auswählen", expanded=False):
-    selected_zeitraeume = st.multiselect(
-        "Zeiträume auswählen:",
-        options=zeitraeume,
-        default=default_zeitraeume,
-        key="zeitraeume_dropdown"
+    if aufloesung == "Quartale" and not aufschluesseln:
+        # Daten nach Auswahl filtern: die Reihe ist bereits nach Zeit (Periode) sortiert,
+        # gefiltert wird nur noch innerhalb der gewählten Reihe
+        with timing.span("Außenhandel filtern"):
+            serie = series_index.get((richtung, packmittel), df.iloc[0:0])
+            df_filtered = filter_series(serie, selected_zeitraeume)
+        y_prozent = "prozentuale Veränderung zum Vorjahresquartal"
+    else:
+        # Drill-down aus dem vorberechneten Würfel: Ausschnitt per Dict-Zugriff, danach nur
+        # noch der Zeitraumfilter (Monate über ihr Quartal: Monatsschlüssel // 3)
+        with timing.span("Außenhandel filtern (Würfel)"):
+            granularitaet = "Quartal" if aufloesung == "Quartale" else "Monat"
+            df_filtered = data_store.select_cube(cube_index, hierarchie, richtung, packmittel,
+                                                 granularitaet, selected_zeitraeume, aufschluesseln)
+            labels = data_store.period_labels if granularitaet == "Quartal" else data_store.month_labels
+            df_filtered = df_filtered.assign(**{
+                "Jahr-Monat": labels(df_filtered["Periode"]),
+                "Import/Export": richtung,
+            })
+        y_prozent = data_store.CUBE_CHANGE
+
+        titel_zusatz = [anzeigeart if granularitaet == "Quartal" else MONATS_ANZEIGEART[anzeigeart]]
+        if aufschluesseln:
+            titel_zusatz.append(f"{packmittel} nach Warennummern")
+            figure_options = {
+                "color": "Polymerart/Packmittel",
+                "legend_title": "Polymerart / Packmittel",
+                # Absolutwerte gestapelt (ergibt das Gesamt-Aggregat), Veränderungsraten nebeneinander
+                "barmode": "group" if prozentual else "relative",
+            }
+        figure_options["title"] = f"Entwicklung des Außenhandels ({', '.join(titel_zusatz)})"
+
+    y_spalte, y_range, y_label = trade_y_axis(df_filtered, anzeigeart, y_prozent, gestapelt=aufschluesseln)
+
+    # Figur aus dem Cache (Schlüssel: Datenversion + normalisierte Auswahl)
+    trade_figure_key = ("aussenhandel", trade_info["version"], tuple(sorted(selected_zeitraeume)),
+                        richtung, packmittel, anzeigeart, aufloesung, aufschluesseln)
+    fig = cached_figure(
+        trade_figure_key,
+        lambda: build_trade_figure(df_filtered, y_spalte, y_range, y_label, anzeigeart, **figure_options),
+        "Außenhandel, px.bar"
     )
 
-# Daten nach Auswahl filtern
-df_filtered = df[
-    (df["Import/Export"] == richtung) &
-    (df["Polymerart/Packmittel"] == packmittel) &
-    (df["Jahr-Monat"].isin(selected_zeitraeume))
-]
-
-# Sortieren nach Zeit (Jahr-Monat)
-df_filtered = df_filtered.sort_values("Jahr-Monat")
-
-if anzeigeart == "Prozentuale Veränderung zum Vorjahresquartal":
-    y_spalte = "prozentuale Veränderung zum Vorjahresquartal"
-    y_range = [-100, 100]
-    y_label = "in Prozent"
-else:
-    y_spalte = "Tsd. EUR"
-    if not df_filtered.empty:
-        max_wert = df_filtered[y_spalte].max()
-        y_max = calculate_dynamic_y_range(max_wert)
-    else:
-        y_max = 1000
-    y_range = [0, y_max]
-    y_label = "in Tsd. EUR"
-
-fig = px.bar(
-    df_filtered,
-    x="Jahr-Monat",
-    y=y_spalte,
-    color="Import/Export",
-    labels={
-        "Jahr-Monat": "Zeitraum",
-        y_spalte: y_label,
-        "Import/Export": "Handelsrichtung"
-    },
-    title=f"Entwicklung des Außenhandels ({anzeigeart})"
-)
+    # Diagramm anzeigen
+    with timing.span("st.plotly_chart (Außenhandel)"):
+        st.plotly_chart(fig, use_container_width=True)
 
-fig.update_yaxes(range=y_range)
-
-# Layout-Anpassungen für bessere Darstellung
-(fig.update_layout
-    (xaxis=dict(
-        title="Zeitraum",
-        tickangle=45,  # Drehrichtung der X-Achsen-Beschriftung anpassen
-        tickfont=dict(color="black")  # Achsenbeschriftung in Schwarz
-    ),
-    yaxis=dict(
-        title=y_label,
-        range=y_range,
-        tickformat=",",  # Keine Abkürzungen wie M oder K auf der Y-Achse, sondern absolute Zahlen
-        tickfont=dict(color="black")  # Achsenbeschriftung in Schwarz
-    ),
-    legend_title="Handelsrichtung",
-    bargap=0.2,  # Abstand zwischen Balken
-))
-
-# Diagramm anzeigen
-st.plotly_chart(fig, use_container_width=True)
+    # Daten des Diagramms zum Herunterladen (absolute Werte und Veränderungsraten, daher
+    # unabhängig von der Anzeigeart)
+    export_key = ("aussenhandel", trade_info["version"], tuple(sorted(selected_zeitraeume)),
+                  richtung, packmittel, aufloesung, aufschluesseln)
+    download_buttons(export_key, lambda: export.view_rows(df_filtered),
+                     prerender.slug(f"aussenhandel {richtung} {packmittel} {aufloesung}"), "Außenhandel")
+
+section, section_open = lazy_section("Außenhandel anzeigen", "lazy_aussenhandel")
+if section_open:
+    with section:
+        # Daten laden und Fehlerbehandlung
+        try:
+            # Aktuelle Version; neue CSV-Lieferungen übernimmt der Hintergrund-Abgleich
+            with timing.span("Datenversion prüfen (Außenhandel)"):
+                trade_info = current_dataset("aussenhandel")
+            with timing.span("load_data"):
+                df = load_data(trade_info)
+        except FileNotFoundError:
+            st.error("CSV-Datei wurde nicht gefunden. Bitte überprüfe den Pfad.")
+            st.stop()
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+
+        with timing.span("load_series_index"):
+            series_index = load_series_index(trade_info)
+        with timing.span("load_cube_index"):
+            cube_index = load_cube_index(trade_info)
+        aussenhandel_section(df, series_index, cube_index, trade_info)
 
 
 # Beispieltext für das Lesebeispiel
@@ -603,7 +706,7 @@ lesebeispiel_text = """
 
 Die X-Achse zeigt die Entwicklung des Außenhandels im Zeitverlauf an. Auf der Y-Achse wird die Entwicklung des Außenhandels in Euro oder im Verhältnis zum Vorjahresquartal abgebildet - abhängig davon welche Filter für die Anzeigeart ausgewählt wurden.
 
-**Auswahl der Polymerart / Packmittel:** Gesamt_Packmittel bzw. Gesamt_Polymere stellen ein Aggregat aus allen im Filter hinterlegten Packmitteln bzw. Polymeren dar. 
+**Auswahl der Polymerart / Packmittel:** Gesamt_Packmittel bzw. Gesamt_Polymere stellen ein Aggregat aus allen im Filter hinterlegten Packmitteln bzw. Polymeren dar. Über „nach Warennummern aufschlüsseln“ wird das Aggregat in die einzelnen Warennummern zerlegt; mit der zeitlichen Auflösung „Monate“ werden die Monatswerte der gewählten Quartale angezeigt.
 
 **Interpretation der aktuellen Werte:** Im Zeitverlauf sind deutliche Schwankungen der deutschen Exportwerte erkennbar. Besonders auffällig ist der Anstieg in 2022, mit Höchstwerten von über 1,3 Milliarden Euro. Nach dem Höhepunkt 2022 folgte ein leichter Rückgang, wobei die Werte in 2023 und 2024 weiterhin über dem Niveau von vor 2021 liegen.
 """
@@ -637,8 +740,28 @@ Dr. Laura C. Müller
 L.Mueller@Kunststoffverpackungen.de
     """)
 
-
-
-
-
-
+timing.record("Skriptlauf", time.perf_counter() - run_start)
+
+# Debug-Panel: Laufzeiten dieses Skriptlaufs, Summen seit Prozessstart und Caches.
+# Messungen aus Teil-Reruns (Fragmente) erscheinen hier erst beim nächsten vollen Lauf.
+if debug_mode:
+    with st.expander("Debug: Laufzeiten", expanded=True):
+        st.subheader("Dieser Skriptlauf")
+        st.dataframe(pd.DataFrame(timing.run_spans()), hide_index=True)
+        st.subheader("Seit Prozessstart")
+        st.dataframe(pd.DataFrame(timing.totals()), hide_index=True)
+        st.subheader("Warm-up")
+        st.json(warm_up_status())
+        st.subheader("Caches")
+        get_figure_cache(), get_export_cache()  # auch vor dem ersten Eintrag anzeigen
+        st.dataframe(pd.DataFrame(cache.all_stats()).T, hide_index=False)
+        st.subheader("Speicher")
+        # Speicher je Sitzung misst benchmark.py --sessions N
+        st.json({
+            "prozess_rss_mb": round(timing.current_rss_mb(), 1),
+            "session_state_eintraege": len(st.session_state),
+        })
+        st.subheader("Figuren-Payload (zuletzt erzeugt)")
+        st.dataframe(pd.DataFrame(payload.report()), hide_index=True)
+        if timing.DUMP_PATH:
+            st.caption(f"Alle Messungen werden als JSON-Zeilen nach {timing.DUMP_PATH} geschrieben.")
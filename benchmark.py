@@ -0,0 +1,308 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Headless-Benchmark für app.py: führt die App mit Streamlits AppTest gegen die
+# mitgelieferten Daten in data/ aus, spielt feste Interaktionsfolgen ab und misst
+# Kaltstart, Laufzeit je Interaktion, Spitzen-Speicher (RSS) und Größe der
+# Plotly-Figuren, die an den Browser gehen. Läuft komplett offline.
+#
+#   python benchmark.py                       # messen und Ergebnis ausgeben
+#   python benchmark.py --save-baseline       # Ergebnis als Baseline speichern
+#   python benchmark.py --compare             # gegen gespeicherte Baseline vergleichen
+
+APP_PATH = Path(__file__).with_name("app.py")
+DEFAULT_BASELINE = Path(__file__).with_name("benchmark_baseline.json")
+
+
+def set_multiselect(label, value):
+    def interact(at):
+        widget = next(w for w in at.multiselect if w.label == label)
+        widget.set_value(value)
+    return interact
+
+
+def set_selectbox(key, index):
+    def interact(at):
+        widget = at.selectbox(key=key)
+        widget.set_value(widget.options[index])
+    return interact
+
+
+def set_radio(index, key=None):
+    def interact(at):
+        widget = at.radio(key=key) if key else at.radio[0]
+        widget.set_value(widget.options[index])
+    return interact
+
+
+def set_checkbox(key, value):
+    def interact(at):
+        at.checkbox(key=key).set_value(value)
+    return interact
+
+
+# Interaktionsfolge wie bei einem typischen Besuch; jeder Schritt ist ein Rerun
+INTERACTIONS = [
+    ("Jahre ändern", set_multiselect("Jahre auswählen:", [2021, 2022, 2023, 2024])),
+    ("Konjunktur-Indikatoren tauschen", set_multiselect("Indikatoren für Konjunktur:", ["Index_Ertrag", "Index_Absatz"])),
+    ("Anzeigeart umschalten", set_radio(0)),
+    ("Polymerart ändern", set_selectbox("polymer_filter", 5)),
+    ("Handelsrichtung ändern", set_selectbox("direction_filter", 1)),
+    ("Anzeigeart zurück", set_radio(1)),
+    ("Monate anzeigen", set_radio(1, key="aufloesung")),
+    ("Gesamt-Aggregat wählen", set_selectbox("polymer_filter", 0)),
+    ("Nach Warennummern aufschlüsseln", set_checkbox("drilldown", True)),
+]
+
+
+# Schlüssel der eingeklappten Abschnitte im Lazy-Modus
+LAZY_SECTIONS = ["lazy_konjunktur", "lazy_arbeitsmarkt", "lazy_rohstoffe", "lazy_aussenhandel"]
+
+
+def open_sections(at):
+    # Der Browser meldet den Zustand geöffneter Expander bei jedem Rerun mit;
+    # AppTest tut das nicht, daher wird der Zustand vor jedem Lauf neu gesetzt
+    for key in LAZY_SECTIONS:
+        at.session_state[key] = True
+
+
+def figure_payload_bytes(at):
+    return sum(len(chart.proto.spec.encode("utf-8")) for chart in at.get("plotly_chart"))
+
+
+def timed_run(at, lazy=False):
+    if lazy:
+        open_sections(at)
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"App-Fehler: {at.exception[0].value}")
+    return elapsed
+
+
+def clear_caches():
+    import streamlit as st
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def run_once(cold_snapshot, lazy):
+    from streamlit.testing.v1 import AppTest
+
+    import timing
+
+    if cold_snapshot:
+        import data_store
+
+        for snapshot in data_store.SNAPSHOT_DIR.glob("*.feather"):
+            snapshot.unlink()
+    clear_caches()
+
+    at = AppTest.from_file(str(APP_PATH), default_timeout=120)
+    result = {"cold_start_s": timed_run(at), "steps": {}}
+    result["steps"]["Erstaufruf"] = {"payload_bytes": figure_payload_bytes(at), "peak_rss_mb": timing.peak_rss_mb()}
+    interactions = INTERACTIONS
+    if lazy:
+        # Im Lazy-Modus erst alle Abschnitte öffnen, sonst gibt es keine Widgets
+        interactions = [("Alle Abschnitte öffnen", lambda at: None)] + INTERACTIONS
+    for name, interact in interactions:
+        interact(at)
+        elapsed = timed_run(at, lazy)
+        result["steps"][name] = {
+            "rerun_s": elapsed,
+            "payload_bytes": figure_payload_bytes(at),
+            "peak_rss_mb": timing.peak_rss_mb(),
+        }
+
+    # Größe je Diagramm vor/nach dem Kompaktieren (siehe payload.py)
+    import payload
+
+    result["payload"] = payload.report()
+    return result
+
+
+def measure_sessions(count, lazy):
+    # Speicher je zusätzlicher Sitzung: eine erste Sitzung füllt die gemeinsamen Caches,
+    # danach werden `count` weitere Sitzungen gleichzeitig offen gehalten und komplett
+    # durchgespielt. Der RSS-Zuwachs enthält auch den Overhead von AppTest selbst und ist
+    # daher eine Obergrenze.
+    from streamlit.testing.v1 import AppTest
+
+    import timing
+
+    clear_caches()
+    interactions = INTERACTIONS
+    if lazy:
+        interactions = [("Alle Abschnitte öffnen", lambda at: None)] + INTERACTIONS
+
+    def open_session():
+        at = AppTest.from_file(str(APP_PATH), default_timeout=120)
+        timed_run(at, lazy)
+        for _, interact in interactions:
+            interact(at)
+            timed_run(at, lazy)
+        return at
+
+    sessions = [open_session()]
+    gc.collect()
+    before = timing.current_rss_mb()
+    sessions += [open_session() for _ in range(count)]
+    gc.collect()
+    after = timing.current_rss_mb()
+    return {"sessions": count, "rss_before_mb": before, "rss_after_mb": after,
+            "per_session_mb": (after - before) / count}
+
+
+def measure_workbook(repeat):
+    # Einlesen der IK/HWWI-Arbeitsmappe: bisheriger Weg (pd.read_excel, komplettes
+    # Objektmodell), zeilenweises Lesen im Read-only-Modus und Treffer in der typisierten
+    # Kopie je Dateiinhalt (data_store.read_workbook_cached). Millisekunden, Median.
+    import pandas as pd
+
+    import data_store
+
+    path = data_store.source_files("konjunktur")[-1]
+    data_store.read_workbook_cached(path)
+
+    def median_ms(read):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            read(path)
+            times.append(time.perf_counter() - start)
+        return statistics.median(times) * 1000
+
+    return {
+        "datei": str(path),
+        "read_excel_ms": median_ms(pd.read_excel),
+        "read_only_ms": median_ms(data_store.read_workbook),
+        "kopie_ms": median_ms(data_store.read_workbook_cached),
+    }
+
+
+def run_benchmark(repeat, cold_snapshot, lazy):
+    runs = [run_once(cold_snapshot, lazy) for _ in range(repeat)]
+
+    # Median über alle Wiederholungen; Payload ist deterministisch
+    summary = {
+        "cold_start_s": statistics.median(r["cold_start_s"] for r in runs),
+        "peak_rss_mb": max(step["peak_rss_mb"] for r in runs for step in r["steps"].values()),
+        "steps": {},
+    }
+    for name in runs[0]["steps"]:
+        steps = [r["steps"][name] for r in runs]
+        entry = {"payload_bytes": steps[0]["payload_bytes"]}
+        if "rerun_s" in steps[0]:
+            entry["rerun_s"] = statistics.median(s["rerun_s"] for s in steps)
+        summary["steps"][name] = entry
+    summary["payload"] = runs[-1]["payload"]
+    summary["meta"] = {
+        "repeat": repeat,
+        "lazy": lazy,
+        "cold_snapshot": cold_snapshot,
+        "python": sys.version.split()[0],
+    }
+    return summary
+
+
+def print_summary(summary):
+    print(f"Kaltstart:          {summary['cold_start_s'] * 1000:8.1f} ms")
+    print(f"Spitzen-RSS:        {summary['peak_rss_mb']:8.1f} MB")
+    for name, step in summary["steps"].items():
+        rerun = f"{step['rerun_s'] * 1000:8.1f} ms" if "rerun_s" in step else " " * 11
+        print(f"  {name:<34}{rerun}  {step['payload_bytes'] / 1024:8.1f} KiB Figuren")
+    if "memory" in summary:
+        memory = summary["memory"]
+        print(f"Speicher je Sitzung: {memory['per_session_mb']:8.2f} MB "
+              f"({memory['sessions']} Sitzungen, RSS {memory['rss_before_mb']:.1f} -> {memory['rss_after_mb']:.1f} MB)")
+    if "workbook" in summary:
+        workbook = summary["workbook"]
+        print(f"Arbeitsmappe einlesen ({workbook['datei']}):")
+        print(f"  pd.read_excel:     {workbook['read_excel_ms']:8.1f} ms")
+        print(f"  Read-only-Modus:   {workbook['read_only_ms']:8.1f} ms")
+        print(f"  typisierte Kopie:  {workbook['kopie_ms']:8.1f} ms")
+    print("Figuren-Payload je Diagramm (vorher -> nachher):")
+    for entry in summary["payload"]:
+        print(f"  {entry['diagramm']:<34}{entry['vorher_bytes'] / 1024:8.1f} KiB -> {entry['nachher_bytes'] / 1024:6.1f} KiB")
+
+
+def compare(summary, baseline, tolerance):
+    # Meldet alle Kennzahlen, die mehr als `tolerance` (relativ) schlechter sind
+    regressions = []
+
+    def check(name, new, old):
+        if old and new > old * (1 + tolerance):
+            regressions.append(f"{name}: {old:.4g} -> {new:.4g} (+{(new / old - 1) * 100:.0f} %)")
+
+    check("Kaltstart [s]", summary["cold_start_s"], baseline["cold_start_s"])
+    check("Spitzen-RSS [MB]", summary["peak_rss_mb"], baseline["peak_rss_mb"])
+    for name, step in summary["steps"].items():
+        old = baseline["steps"].get(name)
+        if old is None:
+            continue
+        if "rerun_s" in step:
+            check(f"{name} [s]", step["rerun_s"], old.get("rerun_s"))
+        check(f"{name} Payload [B]", step["payload_bytes"], old.get("payload_bytes"))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless-Benchmark für das IK-Dashboard")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen (Median wird berichtet)")
+    parser.add_argument("--lazy", action="store_true", help="App im Lazy-Modus messen")
+    parser.add_argument("--cold-snapshot", action="store_true",
+                        help="Arrow-Snapshot vor jedem Lauf löschen (misst das Einlesen der CSV mit)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Pfad der Baseline-Datei")
+    parser.add_argument("--save-baseline", action="store_true", help="Ergebnis als neue Baseline speichern")
+    parser.add_argument("--compare", action="store_true", help="Mit der Baseline vergleichen")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Erlaubte Verschlechterung (0.25 = 25 %%)")
+    parser.add_argument("--json", action="store_true", help="Ergebnis als JSON ausgeben")
+    parser.add_argument("--sessions", type=int, default=0,
+                        help="Zusätzlich den Speicher je Sitzung mit N gleichzeitig offenen Sitzungen messen")
+    parser.add_argument("--workbook", action="store_true",
+                        help="Zusätzlich das Einlesen der Konjunktur-Arbeitsmappe messen (bisher vs. Read-only vs. Kopie)")
+    args = parser.parse_args(argv)
+
+    # app.py nutzt relative Pfade (data/, assets/)
+    os.chdir(APP_PATH.parent)
+    sys.path.insert(0, str(APP_PATH.parent))
+    os.environ["IK_DASHBOARD_LAZY"] = "1" if args.lazy else "0"
+    logging.disable(logging.WARNING)
+
+    summary = run_benchmark(args.repeat, args.cold_snapshot, args.lazy)
+    if args.sessions:
+        summary["memory"] = measure_sessions(args.sessions, args.lazy)
+    if args.workbook:
+        summary["workbook"] = measure_workbook(max(args.repeat, 20))
+    if args.json:
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+    else:
+        print_summary(summary)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Baseline gespeichert: {args.baseline}")
+
+    if args.compare:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(summary, baseline, args.tolerance)
+        if regressions:
+            print("Regressionen gegenüber der Baseline:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("Keine Regressionen gegenüber der Baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Kleiner, prozessweiter LRU-Cache (thread-sicher, da Streamlit jede Sitzung in
+# einem eigenen Thread ausführt). Begrenzt wird er über
+#   - die Anzahl der Einträge (maxsize),
+#   - optional ein Speicherbudget in Bytes (max_bytes, Größe je Eintrag über sizeof()),
+#   - optional eine Lebensdauer in Sekunden (ttl, abgelaufene Einträge gelten als Fehlschlag).
+# Bei Überschreitung fallen die am längsten nicht genutzten Einträge heraus. Einträge einer
+# alten Datenversion entfernt bzw. übernimmt rekey()/invalidate(). Treffer, Fehlschläge,
+# Verdrängungen und die aktuelle Größe zählt stats(); alle benannten Caches eines Prozesses
+# liefert all_stats() (Debug-Panel der App, /cache der API).
+
+# Name -> Cache (zuletzt angelegter Cache dieses Namens)
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def sizeof(value):
+    # Ungefährer Speicherbedarf in Bytes: DataFrames/Series tief (inkl. Strings),
+    # NumPy-Arrays über ihre Puffer, Container rekursiv, sonst sys.getsizeof
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(index=True, deep=True))
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    def __init__(self, maxsize=128, max_bytes=None, ttl=None, name=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.rejected = 0
+        self.bytes = 0
+        # key -> (value, Größe in Bytes, Ablaufzeitpunkt oder None)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        if name:
+            with _registry_lock:
+                _registry[name] = self
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+
+    def _purge_expired(self):
+        # Abgelaufene Einträge freigeben, auch wenn sie nicht mehr abgefragt werden
+        now = time.monotonic()
+        for key in [key for key, (_, _, expires) in self._data.items() if expires <= now]:
+            self._remove(key)
+            self.expirations += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        # Größe (Schlüssel und Wert) außerhalb der Sperre bestimmen (bei DataFrames nicht ganz billig)
+        size = sizeof(key) + sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if self.ttl:
+                self._purge_expired()
+            if self.max_bytes and size > self.max_bytes:
+                # Passt allein nicht ins Budget: nicht speichern, statt alles zu verdrängen
+                self.rejected += 1
+                return
+            expires = time.monotonic() + self.ttl if self.ttl else None
+            self._data[key] = (value, size, expires)
+            self.bytes += size
+            while len(self._data) > self.maxsize or (self.max_bytes and self.bytes > self.max_bytes):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def get_or_create(self, key, create):
+        # create() wird nur bei einem Fehlschlag aufgerufen
+        value = self.get(key)
+        if value is None:
+            value = create()
+            self.put(key, value)
+        return value
+
+    def rekey(self, update):
+        # update(key) liefert den neuen Schlüssel eines Eintrags oder None zum Verwerfen
+        # (z.B. beim Wechsel der Datenversion nur betroffene Einträge entfernen). Gibt es den
+        # neuen Schlüssel schon (von einer anderen Sitzung bereits unter der neuen Version
+        # erzeugt), bleibt dieser Eintrag und der umbenannte wird verworfen.
+        with self._lock:
+            items = list(self._data.items())
+            existing = set(self._data)
+            self._data.clear()
+            self.bytes = 0
+            for key, entry in items:
+                new_key = update(key)
+                if new_key is None or (new_key != key and new_key in existing):
+                    self.invalidations += 1
+                    continue
+                if new_key in self._data:
+                    # Zwei alte Einträge mit demselben neuen Schlüssel: der erste bleibt
+                    self.invalidations += 1
+                    continue
+                self._data[new_key] = entry
+                self.bytes += entry[1]
+
+    def invalidate(self, predicate):
+        # Alle Einträge verwerfen, deren Schlüssel predicate(key) erfüllt
+        self.rekey(lambda key: None if predicate(key) else key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "maxsize": self.maxsize,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "rejected": self.rejected,
+            }
+
+
+def all_stats():
+    # Statistiken aller benannten Caches dieses Prozesses
+    with _registry_lock:
+        caches = dict(_registry)
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -0,0 +1,187 @@
+import indicators
+
+# Registry der Liniendiagramm-Dashboards (Konjunktur, Arbeitsmarkt, Rohstoffe, ...). Jedes
+# Dashboard beschreibt sich hier vollständig: Datensatz (data_store.SOURCES), Indikatoren
+# je Y-Achse mit Achsentitel, vorausgewählte Indikatoren und die Texte für "Über dieses
+# Dashboard" und das Lesebeispiel. app.py erzeugt daraus die Abschnitte, figures.py die
+# Figuren, prerender.py die Standardansichten und api.py die erlaubten Indikatoren.
+#
+# Ein neues Dashboard (z.B. Energiekosten oder Recyclingquoten) ist ein neuer Eintrag: die
+# App liest je Dashboard nur dessen Spalten aus dem Datensatz, und zwar erst, wenn der
+# Abschnitt angezeigt wird (im Lazy-Modus also erst beim Öffnen). Die Reihenfolge der
+# Einträge ist die Reihenfolge auf der Seite.
+#
+# Felder je Dashboard:
+#   quelle       Datensatz mit Quartalsachse wie "konjunktur" (Jahr, Monat, Zeitachse)
+#   achsen       "links"/"rechts" -> (Achsentitel, Indikatoren auf dieser Achse); die
+#                Auswahlliste zeigt erst die linke, dann die rechte Achse
+#   standard     vorausgewählte Indikatoren (höchstens MAX_SELECTIONS)
+#   info         Text für "Über dieses Dashboard"
+#   lesebeispiel Text unter der Figur (optional)
+
+MAX_SELECTIONS = 3
+
+# Spalten, die jedes Dashboard neben seinen Indikatoren braucht (Filter und x-Achse)
+BASE_COLUMNS = ["Jahr", "Monat", "Quartal_Sortierung", "Zeitachse"]
+
+KONJUNKTUR_INFO = """
+Dieses Dashboard zeigt zwei Arten von Daten für die deutsche Kunststoffverpackungs- und Folienindustrie:
+
+**1. Offizielle Statistiken (Destatis):**
+- Umsatz (in Euro)
+- Auslandsumsatz gesamt (in Euro)
+- Auslandsumsatz mit der Eurozone (in Euro)
+- Auslandsumsatz mit dem sonstigen Ausland (in Euro)
+
+**2. IK-Konjunkturumfrage (Quartalsdaten), berichtet über die Geschäftserwartungen:**
+- Index_Ertrag
+- Index_Exporte
+- Index_Wirtschaftslage
+- Index_Absatz
+
+➡️ Alle Daten beziehen sich ausschließlich auf die Kunststoffverpackungs- und Folienindustrie in Deutschland.
+"""
+
+KONJUNKTUR_LESEBEISPIEL = """
+### Lesebeispiel:
+
+Die linke Y-Achse zeigt die Umsatzwerte in Euro, während die rechte Y-Achse die Indexwerte anzeigt. Nicht alle Indikatoren können historisch über den kompletten Zeitverlauf abgebildet werden.
+
+**Was ist ein Indexwert?**
+Ein Indexwert zeigt Veränderungen im Vergleich zu einem Basiszeitraum an. Bei den IK-Indizes zeigt ein positiver Wert eine Verbesserung, ein negativer Wert eine Verschlechterung der Situation im Vergleich zum Vorquartal an. Die IK-Indizes basieren auf den Einschätzungen der befragten Unternehmen und können Werte zwischen -100 und +100 annehmen. Je höher der absolute Wert, desto stärker ist der Konsens unter den Befragten. Beispielsweise würde ein IK-Index von +50 bedeuten, dass deutlich mehr Unternehmen eine Verbesserung als eine Verschlechterung erwarten, während ein Wert von -50 auf eine überwiegend negative Einschätzung hindeuten würde. Die Salden basieren auf folgender Rechnung: Anteil der Positivmeldungen minus Anteil der Negativmeldungen.
+
+**Interpretation der aktuellen Werte:**
+Im vierten Quartal 2023 lag der Gesamtumsatz bei 5,8 Mio. Euro, wovon 2,7 Mio. Euro auf den Auslandsumsatz entfielen. Der Index für Exporte erreichte einen Wert von -43 Punkten, was auf eine deutlich pessimistischere Einschätzung der Exportentwicklung durch die befragten Unternehmen im Vergleich zum Vorquartal hindeutet. Diese negative Einschätzung hat sich in den Daten bestätigt: Die Exportzahlen zeigen einen Rückgang vom zweiten zum dritten Quartal 2023.
+"""
+
+ARBEITSMARKT_INFO = """
+Dieses Dashboard zeigt zwei Arten von Daten für die deutsche Kunststoffverpackungs- und Folienindustrie:
+
+**1. Offizielle Statistiken (Destatis):**
+- Betriebe (Anzahl)
+- Beschäftigte (Anzahl)
+
+**2. IK-Konjunkturumfrage (Quartalsdaten), berichtet über die Geschäftserwartungen:**
+- Index_Beschäftigtenzahl
+- Index_Wirtschaftslage
+
+➡️ Alle Daten beziehen sich ausschließlich auf die Kunststoffverpackungs- und Folienindustrie in Deutschland.
+"""
+
+ARBEITSMARKT_LESEBEISPIEL = """
+### Lesebeispiel:
+
+Die linke Y-Achse zeigt die absoluten Werte der Beschäftigten und Betriebe, während die rechte Y-Achse die Indexwerte anzeigt. Nicht alle Indikatoren können historisch über den kompletten Zeitverlauf abgebildet werden.
+
+**Was ist ein Indexwert?**
+Ein Indexwert zeigt Veränderungen im Vergleich zu einem Basiszeitraum an. Bei den IK-Indizes zeigt ein positiver Wert eine Verbesserung, ein negativer Wert eine Verschlechterung der Situation im Vergleich zum Vorquartal an. Die IK-Indizes basieren auf den Einschätzungen der befragten Unternehmen und können Werte zwischen -100 und +100 annehmen. Je höher der absolute Wert, desto stärker ist der Konsens unter den Befragten. Beispielsweise würde ein IK-Index von +50 bedeuten, dass deutlich mehr Unternehmen eine Verbesserung als eine Verschlechterung erwarten, während ein Wert von -50 auf eine überwiegend negative Einschätzung hindeuten würde. Die Salden basieren auf folgender Rechnung: Anteil der Positivmeldungen minus Anteil der Negativmeldungen.
+
+**Interpretation der aktuellen Werte:**
+Im vierten Quartal 2023 lag die Anzahl der Beschäftigten bei 91.700 Personen. Der Index für die Beschäftigtenzahl liegt bei -32,6 Punkten, während der Index für die Wirtschaftslage bei -62,9 Punkten liegt. Dies deutet auf eine deutlich pessimistische Einschätzung sowohl der Beschäftigungsentwicklung als auch der allgemeinen Wirtschaftslage hin.
+"""
+
+ROHSTOFFE_INFO = """
+Dieses Dashboard zeigt zwei Arten von Daten:
+
+**1. Offizielle Statistiken (HWWI):**
+- Index_Preisentwicklung Energierohstoffe
+- Index_Preisentwicklung Kohle
+- Index_Preisentwicklung Rohöl
+- Index_Preisentwicklung Erdgas
+
+**2. IK-Konjunkturumfrage (Quartalsdaten), berichtet über die Geschäftserwartungen:**
+- Index_Ertrag
+- Index_Rohstoffverfügbarkeit
+
+➡️ Alle Daten des HWWI beziehen sich auf Deutschland insgesamt, Daten der IK-Konjunkturumfrage beziehen sich auf die Branche der Kunststoffverpackungs- und Folienindustrie in Deutschland.
+"""
+
+ROHSTOFFE_LESEBEISPIEL = """
+### Lesebeispiel:
+
+Die Y-Achse zeigt die verschiedenen Indexwerte an. Da es sich ausschließlich um Indizes handelt, wird nur eine Y-Achse benötigt. Nicht alle Indikatoren können historisch über den kompletten Zeitverlauf abgebildet werden.
+
+**Was ist ein Indexwert?**
+Ein Indexwert zeigt Veränderungen im Vergleich zu einem Basiszeitraum an. Bei den HWWI-Indizes (Energierohstoffe, Rohöl, Kohle, Erdgas) zeigt ein höherer Wert steigende Preise an. Bei den IK-Indizes zeigt ein positiver Wert eine Verbesserung, ein negativer Wert eine Verschlechterung der Situation im Vergleich zum Vorquartal an. Die IK-Indizes basieren auf den Einschätzungen der befragten Unternehmen und können Werte zwischen -100 und +100 annehmen. Je höher der absolute Wert, desto stärker ist der Konsens unter den Befragten. Beispielsweise würde ein IK-Index von +50 bedeuten, dass deutlich mehr Unternehmen eine Verbesserung als eine Verschlechterung erwarten, während ein Wert von -50 auf eine überwiegend negative Einschätzung hindeuten würde.
+
+**Interpretation der aktuellen Werte:**
+Im dritten Quartal 2022 erreichte der Index zur Preisentiwcklung der Energierohstoffe mit 718 Punkten einen historischen Höchststand. Diese extreme Preisentwicklung bei den Energierohstoffen spiegelt sich deutlich in den Einschätzungen der Unternehmen wider: Der Index für die Rohstoffverfügbarkeit liegt bei -17,4 Punkten, was auf Schwierigkeiten bei der Beschaffung hinweist. Besonders gravierend wirkt sich dies auf die Ertragslage aus, die mit einem Index von -76 Punkten einen sehr niedrigen Stand erreicht. Die außergewöhnlich hohen Energiepreise belasten die Unternehmen stark, da diese Kostensteigerungen nicht vollständig an die Kunden weitergegeben werden können.
+"""
+
+DASHBOARDS = {
+    "Konjunktur": {
+        "quelle": "konjunktur",
+        "achsen": {
+            "links": ("Absolute Werte (Nicht-Index Indikatoren)",
+                      ["Umsatz", "Auslandsumsatz", "Auslandsumsatz mit der Eurozone",
+                       "Auslandsumsatz mit dem sonstigen Ausland"]),
+            "rechts": ("Index-Wert",
+                       ["Index_Ertrag", "Index_Exporte", "Index_Wirtschaftslage", "Index_Absatz"]),
+            #"Index_Umsatz", "Index_Verkaufspreise (Branchenprodukte)"
+        },
+        "standard": ["Umsatz", "Auslandsumsatz", "Index_Exporte"],
+        "info": KONJUNKTUR_INFO,
+        "lesebeispiel": KONJUNKTUR_LESEBEISPIEL,
+    },
+    "Arbeitsmarkt": {
+        "quelle": "konjunktur",
+        "achsen": {
+            "links": ("Absolute Werte (Nicht-Index Indikatoren)", ["Betriebe", "Beschäftigte"]),
+            "rechts": ("Index-Wert", ["Index_Beschäftigtenzahl", "Index_Wirtschaftslage"]),
+        },
+        "standard": ["Beschäftigte", "Index_Beschäftigtenzahl", "Index_Wirtschaftslage"],
+        "info": ARBEITSMARKT_INFO,
+        "lesebeispiel": ARBEITSMARKT_LESEBEISPIEL,
+    },
+    "Rohstoffe": {
+        "quelle": "konjunktur",
+        # Nur Indizes: eine gemeinsame Achse links
+        "achsen": {
+            "links": ("Index-Werte",
+                      ["Index_Rohstoffverfügbarkeit", "Index_Preisentwicklung Energierohstoffe",
+                       "Index_Preisentwicklung Kohle", "Index_Preisentwicklung Rohöl",
+                       "Index_Preisentwicklung Erdgas", "Index_Ertrag"]),
+            #"Index_Verkaufspreise (Branchenprodukte)"
+        },
+        "standard": ["Index_Preisentwicklung Energierohstoffe", "Index_Ertrag", "Index_Rohstoffverfügbarkeit"],
+        "info": ROHSTOFFE_INFO,
+        "lesebeispiel": ROHSTOFFE_LESEBEISPIEL,
+    },
+}
+
+
+def indicator_options(name):
+    # Auswählbare Indikatoren eines Dashboards (linke Achse zuerst)
+    return [indicator for _, columns in DASHBOARDS[name]["achsen"].values() for indicator in columns]
+
+
+def all_indicators():
+    # Alle Indikatoren aller Dashboards, ohne Doppelte, in Seitenreihenfolge
+    return list(dict.fromkeys(indicator for name in DASHBOARDS for indicator in indicator_options(name)))
+
+
+def axis(name, indicator):
+    # "links" oder "rechts" für einen Indikator des Dashboards
+    return next(side for side, (_, columns) in DASHBOARDS[name]["achsen"].items() if indicator in columns)
+
+
+def axis_title(name, side):
+    return DASHBOARDS[name]["achsen"].get(side, (None, []))[0]
+
+
+def columns(name, available):
+    # Spalten, die das Dashboard aus seinem Datensatz braucht (Basisspalten und Indikatoren),
+    # soweit der Datensatz sie enthält
+    return [column for column in BASE_COLUMNS + indicator_options(name) if column in available]
+
+
+def derived_columns(name, available):
+    # Abgeleitete Spalten der Indikatoren (siehe indicators.py), soweit vorberechnet
+    wanted = [indicators.column_name(indicator, kind)
+              for indicator in indicator_options(name) for kind in indicators.UMRECHNUNGEN]
+    return [column for column in wanted if column in available]
+
+
+def lazy_key(name):
+    # Schlüssel des eingeklappten Abschnitts im Lazy-Modus (z.B. "lazy_konjunktur")
+    return f"lazy_{name.lower()}"
@@ -0,0 +1,822 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+import indicators
+
+# Versionierte, typisierte Datenablage (Arrow IPC / Feather) für die Quelldateien in data/.
+# Die Rohdateien (Destatis-CSV, IK/HWWI-Arbeitsmappe) werden einmal eingelesen, geprüft
+# und aufbereitet und als Datensatz je Quellversion abgelegt. Zu jedem Datensatz gehört
+# eine kleine JSON-Beschreibung (Quelle, Version, verfügbare Zeiträume). Die App lädt
+# nur noch diese Datensätze (per Memory-Mapping). Neue oder geänderte Quelldateien werden
+# inkrementell übernommen: nur die neue Datei wird eingelesen, ihre Zeilen werden in den
+# bestehenden Datensatz gemischt und als neue Version abgelegt (siehe refresh).
+
+# Die geladenen Datensätze werden von allen Sitzungen/Anfragen geteilt; Copy-on-Write
+# stellt sicher, dass ein Ausschnitt nie in die gemeinsamen Daten zurückschreibt. Ab
+# pandas 3 immer aktiv, mit pandas 2 hier ausdrücklich eingeschaltet.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = Path('data/cache')
+
+# Wird erhöht, wenn sich die Aufbereitung ändert; ältere Datensätze werden dann neu erzeugt
+FORMAT_VERSION = 5
+
+# Quelldateien je Datensatz. Jede neue oder geänderte Datei, die zum Muster passt (z.B. eine
+# Lieferung nur mit dem neuen Quartal), wird beim nächsten Abgleich übernommen.
+SOURCES = {
+    "aussenhandel": "data/Destatis_Außenhandel*.csv",
+    "konjunktur": "data/IK_Konj*.xlsx",
+}
+
+# Schlüssel einer Zeile: eine neuere Datei ersetzt Zeilen mit gleichem Schlüssel
+# (Revisionen) und ergänzt neue; Zeilen werden beim Mischen nie gelöscht
+ROW_KEYS = {
+    "aussenhandel": ["Import/Export", "Maßeinheit", "Warennummer", "Jahr", "Monat"],
+    "konjunktur": ["Jahr", "Monat"],
+}
+
+# Feste Spaltentypen, damit beim Einlesen nichts geraten werden muss
+CSV_DTYPES = {
+    "Jahr": "float64",
+    "Import/Export": "str",
+    "Maßeinheit": "str",
+    "WZ": "int64",
+    "Kennzahl": "float64",
+    "Polymerart/Packmittel": "str",
+    "Warenverzeichnis": "str",
+    "Warennummer": "str",
+    "Monat": "str",
+    "relative Veränderung zum Vorjahr/Vorjahresmonat/Vorjahresquartal": "float64",
+    "Jahr-Monat": "str",
+}
+
+YOY_COLUMN = "relative Veränderung zum Vorjahr/Vorjahresmonat/Vorjahresquartal"
+QOQ_COLUMN = "relative Veränderung zum Vorquartal"
+
+# Textspalten mit wenigen Ausprägungen werden im Snapshot als Kategorien abgelegt
+# (Reihenfolge wie in der CSV, damit z.B. die Standardauswahl unverändert bleibt)
+CATEGORY_COLUMNS = ["Import/Export", "Maßeinheit", "Polymerart/Packmittel",
+                    "Warenverzeichnis", "Warennummer", "Monat", "Jahr-Monat"]
+
+# Spalten, die das Außenhandel-Diagramm tatsächlich benötigt, und ihre Anzeigenamen
+QUARTAL_COLUMNS = {
+    "Import/Export": "Import/Export",
+    "Polymerart/Packmittel": "Polymerart/Packmittel",
+    "Jahr": "Jahr",
+    "Monat": "Monat",
+    "Kennzahl": "Tsd. EUR",
+    YOY_COLUMN: "prozentuale Veränderung zum Vorjahresquartal",
+}
+
+QUARTALE = {'Q1': 1, 'Q2': 2, 'Q3': 3, 'Q4': 4}
+MONATE = {'Januar': 1, 'Februar': 2, 'März': 3, 'April': 4, 'Mai': 5, 'Juni': 6, 'Juli': 7,
+          'August': 8, 'September': 9, 'Oktober': 10, 'November': 11, 'Dezember': 12}
+
+# Drill-down-Würfel: Aggregate je (Handelsrichtung, Gesamt-Gruppe, Ebene, Granularität).
+# Ebene "Gesamt" ist die Summe der Gruppe (Gesamt_Polymere = WZ 2221, Gesamt_Packmittel =
+# WZ 2222), Ebene "Warennummer" sind die einzelnen Warennummern der Gruppe.
+CUBE_VALUE = "Tsd. EUR"
+CUBE_CHANGE = "prozentuale Veränderung zum Vorjahreszeitraum"
+
+# Pflichtspalten der IK/HWWI-Arbeitsmappe (die Indikatorspalten sind frei)
+KONJUNKTUR_COLUMNS = ["Jahr", "Monat"]
+
+# Textspalten der Arbeitsmappe; alle übrigen Spalten sind Indikatoren und müssen Zahlen sein
+KONJUNKTUR_TEXT_COLUMNS = ["Monat", "WZ CODE", "WZ"]
+
+# Die Daten stehen im ersten Tabellenblatt, Kopfzeile in Zeile 1
+KONJUNKTUR_SHEET = 0
+
+
+# Zeiträume werden intern als ganze Zahl geführt (Jahr * 4 + Quartal - 1), damit
+# Filtern und Sortieren einfache Zahlenvergleiche sind. Das Label "2024-Q3" wird erst
+# für die Anzeige erzeugt.
+def period_key(jahr, quartal):
+    return jahr * 4 + quartal - 1
+
+
+def period_label(key):
+    return f"{key // 4}-Q{key % 4 + 1}"
+
+
+def period_labels(keys):
+    return [period_label(key) for key in keys]
+
+
+# Monate analog (Jahr * 12 + Monat - 1); Monatsschlüssel // 3 ergibt den Quartalsschlüssel
+def month_key(jahr, monat):
+    return jahr * 12 + monat - 1
+
+
+def month_label(key):
+    return f"{key // 12}-{key % 12 + 1:02d}"
+
+
+def month_labels(keys):
+    return [month_label(key) for key in keys]
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def info_path(name):
+    return SNAPSHOT_DIR / f"{name}.json"
+
+
+def dataset_path(info):
+    return SNAPSHOT_DIR / info["file"]
+
+
+def derived_path(info, kind):
+    return SNAPSHOT_DIR / info["derived"][kind]["file"]
+
+
+# --- Außenhandel (Destatis-CSV) ---------------------------------------------------------
+
+def read_csv(csv_path):
+    return pd.read_csv(csv_path, sep=';', encoding='latin1', decimal=',', dtype=CSV_DTYPES)
+
+
+def validate_trade(df):
+    # Bricht mit einer verständlichen Meldung ab, statt später falsche Diagramme zu zeigen
+    missing = [column for column in CSV_DTYPES if column not in df.columns]
+    if missing:
+        raise ValueError(f"Außenhandelsdaten: Spalten fehlen: {', '.join(missing)}")
+
+    problems = []
+    unknown = set(df["Monat"].dropna()) - set(QUARTALE) - set(MONATE) - {"TOTAL"}
+    if unknown:
+        problems.append(f"unbekannte Werte in 'Monat': {', '.join(sorted(unknown))}")
+    if df["Jahr"].isna().any() or (df["Jahr"] % 1 != 0).any():
+        problems.append("'Jahr' enthält leere oder nicht ganzzahlige Werte")
+    else:
+        expected = df["Jahr"].astype(int).astype(str) + "-" + df["Monat"]
+        mismatched = int((expected != df["Jahr-Monat"]).sum())
+        if mismatched:
+            problems.append(f"{mismatched} Zeilen, in denen 'Jahr-Monat' nicht zu 'Jahr' und 'Monat' passt")
+    duplicates = int(df.duplicated(["Import/Export", "Maßeinheit", "Warennummer", "Jahr", "Monat"]).sum())
+    if duplicates:
+        problems.append(f"{duplicates} doppelte Zeilen je (Richtung, Maßeinheit, Warennummer, Zeitraum)")
+    if problems:
+        raise ValueError("Außenhandelsdaten ungültig: " + "; ".join(problems))
+
+
+def add_changes(df):
+    # Veränderungsraten vektorisiert neu berechnen, statt der Spalte aus der CSV zu vertrauen:
+    # Vorjahreswert je (Richtung, Maßeinheit, Warennummer, Monat/Quartal/TOTAL) per Join auf
+    # Jahr - 1, Vorquartalswert per Join auf den vorherigen Periodenschlüssel. Lücken in
+    # den Daten ergeben NaN statt eines verschobenen Vergleichs.
+    keys = ["Import/Export", "Maßeinheit", "Warennummer"]
+
+    previous_year = df[keys + ["Monat", "Jahr", "Kennzahl"]].assign(Jahr=df["Jahr"] + 1)
+    merged = df[keys + ["Monat", "Jahr"]].merge(
+        previous_year, on=keys + ["Monat", "Jahr"], how="left", sort=False
+    )
+    yoy = (df["Kennzahl"].to_numpy() / merged["Kennzahl"].to_numpy() - 1) * 100
+
+    quartal = df["Monat"].map(QUARTALE)
+    periode = period_key(df["Jahr"], quartal)  # NaN für Monats- und TOTAL-Zeilen
+    is_quarter = periode.notna()
+    previous_quarter = df.loc[is_quarter, keys + ["Kennzahl"]].assign(Periode=periode[is_quarter] + 1)
+    merged = df[keys].assign(Periode=periode).merge(
+        previous_quarter, on=keys + ["Periode"], how="left", sort=False
+    )
+    qoq = (df["Kennzahl"].to_numpy() / merged["Kennzahl"].to_numpy() - 1) * 100
+    qoq[~is_quarter.to_numpy()] = float("nan")
+
+    changes = pd.DataFrame({YOY_COLUMN: yoy, QOQ_COLUMN: qoq}, index=df.index)
+    # Division durch 0 ist keine sinnvolle Veränderungsrate
+    return df.assign(**changes.replace([float("inf"), float("-inf")], float("nan")))
+
+
+def parse_trade(csv_path):
+    df = read_csv(csv_path)
+    validate_trade(df)
+    df["Jahr"] = df["Jahr"].astype(int)
+    return df
+
+
+def build_trade(df):
+    # Aufbereitung der (gemischten) Rohzeilen: Veränderungsraten, Typen, Zeitraum, Hierarchie
+    df = df.reset_index(drop=True)
+    source_yoy = df[YOY_COLUMN]
+    df = add_changes(df)
+    corrected = int(((source_yoy - df[YOY_COLUMN]).abs() > 1e-6).sum()
+                    + (source_yoy.isna() != df[YOY_COLUMN].isna()).sum())
+
+    df["Jahr"] = df["Jahr"].astype("int16")
+    for column in CATEGORY_COLUMNS:
+        df[column] = pd.Categorical(df[column], categories=df[column].dropna().unique())
+
+    # Verfügbaren Zeitraum aus den Daten ableiten: Quartale in Tsd. EUR, ab dem ersten
+    # Jahr mit Vorjahresvergleich bis zum letzten gemeldeten Quartal
+    quarters = df[df["Monat"].isin(list(QUARTALE)) & (df["Maßeinheit"] == "Tsd. EUR")]
+    first_year = int(quarters.loc[quarters[YOY_COLUMN].notna(), "Jahr"].min())
+    last_year = int(quarters["Jahr"].max())
+    quarters = quarters[quarters["Jahr"] >= first_year]
+    keys = period_key(quarters["Jahr"].astype(int), quarters["Monat"].map(QUARTALE).astype(int))
+
+    # Hierarchie für den Drill-down: Gesamt-Gruppe -> Polymerarten/Packmittel derselben WZ
+    gesamt = df[df["Warennummer"].astype(str).str.startswith("Gesamt_")]
+    gruppen = dict(zip(gesamt["WZ"], gesamt["Polymerart/Packmittel"].astype(str)))
+    hierarchie = {gruppe: [] for gruppe in gruppen.values()}
+    for wz, member in df[["WZ", "Polymerart/Packmittel"]].drop_duplicates().itertuples(index=False):
+        if member != gruppen.get(wz) and wz in gruppen:
+            hierarchie[gruppen[wz]].append(member)
+
+    meta = {
+        "jahre": [first_year, last_year],
+        "quartale": [int(keys.min()), int(keys.max())],
+        "korrigierte_veraenderungsraten": corrected,
+        "hierarchie": hierarchie,
+    }
+    return df, meta
+
+
+def build_cube(df, meta):
+    # Vorberechneter Würfel für den Drill-down (Quartale/Monate, Gesamt/Warennummern),
+    # einmal pro Datenversion beim Aufbereiten erzeugt. Die Gesamt-Gruppen liegen in der
+    # CSV nur als Quartale vor; ihre Monatswerte werden hier aus den Warennummern summiert
+    # (die Quartalswerte der CSV sind genau diese Summe).
+    gruppe_von = {member: gruppe for gruppe, members in meta["hierarchie"].items() for member in members}
+    gruppe_von.update({gruppe: gruppe for gruppe in meta["hierarchie"]})
+
+    eur = df[(df["Maßeinheit"] == "Tsd. EUR") & (df["Monat"] != "TOTAL")]
+    monat = eur["Monat"].astype(str)
+    quartal = monat.map(QUARTALE)
+    jahr = eur["Jahr"].astype("int32")
+    is_quarter = quartal.notna()
+    packmittel = eur["Polymerart/Packmittel"].astype(str)
+    cube = pd.DataFrame({
+        "Import/Export": eur["Import/Export"].astype(str),
+        "Gruppe": packmittel.map(gruppe_von),
+        "Ebene": np.where(packmittel.isin(list(meta["hierarchie"])), "Gesamt", "Warennummer"),
+        "Granularität": np.where(is_quarter, "Quartal", "Monat"),
+        "Periode": np.where(is_quarter,
+                            period_key(jahr, quartal.fillna(1).astype("int32")),
+                            month_key(jahr, monat.map(MONATE).fillna(1).astype("int32"))),
+        "Polymerart/Packmittel": packmittel,
+        "Warennummer": eur["Warennummer"].astype(str),
+        CUBE_VALUE: eur["Kennzahl"],
+        CUBE_CHANGE: eur[YOY_COLUMN],
+    })
+
+    # Monatswerte der Gesamt-Gruppen: Summe über die Warennummern, Vorjahresvergleich
+    # per Join auf den Monat zwölf Schlüssel vorher
+    keys = ["Import/Export", "Gruppe"]
+    months = cube[(cube["Granularität"] == "Monat") & (cube["Ebene"] == "Warennummer")]
+    rollup = months.groupby(keys + ["Periode"], as_index=False, sort=False)[CUBE_VALUE].sum(min_count=1)
+    previous = rollup.assign(Periode=rollup["Periode"] + 12)
+    merged = rollup[keys + ["Periode"]].merge(previous, on=keys + ["Periode"], how="left", sort=False)
+    change = (rollup[CUBE_VALUE].to_numpy() / merged[CUBE_VALUE].to_numpy() - 1) * 100
+    rollup = rollup.assign(**{
+        "Ebene": "Gesamt",
+        "Granularität": "Monat",
+        "Polymerart/Packmittel": rollup["Gruppe"],
+        "Warennummer": rollup["Gruppe"],
+        CUBE_CHANGE: np.where(np.isfinite(change), change, np.nan),
+    })
+    cube = pd.concat([cube, rollup[cube.columns]], ignore_index=True)
+
+    # Nur das Jahresfenster der App (das Jahr davor diente nur dem Vorjahresvergleich)
+    first_year = meta["jahre"][0]
+    start = np.where(cube["Granularität"] == "Quartal", period_key(first_year, 1), month_key(first_year, 1))
+    cube = cube[cube["Periode"] >= start]
+
+    cube = cube.sort_values(["Import/Export", "Gruppe", "Ebene", "Granularität", "Periode"], kind="stable")
+    cube = cube.reset_index(drop=True).astype({"Periode": "int32"})
+    for column in ["Import/Export", "Gruppe", "Ebene", "Granularität", "Polymerart/Packmittel", "Warennummer"]:
+        cube[column] = pd.Categorical(cube[column], categories=cube[column].unique())
+    return cube
+
+
+# --- Konjunktur (IK/HWWI-Arbeitsmappe) --------------------------------------------------
+
+def read_workbook(xlsx_path, sheet=KONJUNKTUR_SHEET):
+    # Liest nur das Datenblatt, zeilenweise im Read-only-Modus von openpyxl: ohne das
+    # komplette Objektmodell der Arbeitsmappe (Zellobjekte, Formate, weitere Blätter), das
+    # pd.read_excel aufbaut. Spalten ohne Überschrift (nur formatierte Zellen) und leere
+    # Zeilen werden übersprungen. Ergebnis und Spaltentypen wie bei pd.read_excel.
+    workbook = openpyxl.load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[sheet].iter_rows(values_only=True)
+        header = next(rows, ())
+        data = [row for row in rows if any(value is not None for value in row)]
+    finally:
+        workbook.close()
+
+    width = len(header)
+    columns = list(zip(*[row + (None,) * (width - len(row)) for row in data])) if data else [()] * width
+    return pd.DataFrame({str(name): list(columns[i]) for i, name in enumerate(header) if name is not None})
+
+
+def workbook_sidecar_path(digest):
+    return SNAPSHOT_DIR / f"konjunktur-quelle-{digest[:16]}.feather"
+
+
+def read_workbook_cached(xlsx_path):
+    # Typisierte Kopie des eingelesenen Datenblatts je Dateiinhalt (sha256): eine Arbeitsmappe
+    # wird nur einmal geparst, auch wenn der Datensatz neu aufgebaut wird (--full, neue
+    # FORMAT_VERSION, entfernte Lieferung). Die Kopie enthält die unveränderten Rohzeilen und
+    # hängt daher nur vom Inhalt der Datei ab; sie wird mit den Datensätzen aufgeräumt.
+    # Die Kopie ist nur ein Cache: lässt sie sich nicht lesen oder schreiben (z.B. gemischte
+    # Werte in einer Spalte, die Arrow nicht typisieren kann), wird die Arbeitsmappe geparst.
+    sidecar = workbook_sidecar_path(file_hash(xlsx_path))
+    try:
+        return feather.read_feather(sidecar)
+    except FileNotFoundError:
+        pass
+    except (OSError, pa.ArrowException) as e:
+        logger.warning("Kopie der Arbeitsmappe %s nicht lesbar: %s", sidecar.name, e)
+    df = read_workbook(xlsx_path)
+    try:
+        SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+        _write_table(df, sidecar)
+    except (OSError, pa.ArrowException) as e:
+        logger.warning("Kopie der Arbeitsmappe %s nicht geschrieben: %s", Path(xlsx_path).name, e)
+    return df
+
+
+def validate_konjunktur(df):
+    # Bricht mit einer verständlichen Meldung ab, statt später beim Aufbereiten (doppelte
+    # Quartale) oder Ablegen (Text in Zahlenspalten) mit einem Fehler aus pandas/pyarrow
+    missing = [column for column in KONJUNKTUR_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Konjunkturdaten: Spalten fehlen: {', '.join(missing)}")
+
+    problems = []
+    unknown = set(df["Monat"].dropna()) - set(QUARTALE)
+    if unknown:
+        problems.append(f"unbekannte Quartale {', '.join(sorted(map(str, unknown)))}")
+    jahr = pd.to_numeric(df["Jahr"], errors="coerce")
+    if jahr.isna().any() or (jahr % 1 != 0).any():
+        problems.append("'Jahr' enthält leere oder nicht ganzzahlige Werte")
+    else:
+        duplicates = df[df.duplicated(["Jahr", "Monat"], keep=False)]
+        if len(duplicates):
+            quartale = sorted({f"{int(j)}-{m}" for j, m in zip(duplicates["Jahr"], duplicates["Monat"])})
+            problems.append(f"doppelte Quartale {', '.join(quartale)}")
+    for column in df.columns:
+        if column in KONJUNKTUR_COLUMNS + KONJUNKTUR_TEXT_COLUMNS or pd.api.types.is_numeric_dtype(df[column]):
+            continue
+        values = df[column].dropna()
+        text = values[pd.to_numeric(values, errors="coerce").isna()]
+        if len(text):
+            beispiele = ", ".join(repr(value) for value in text.unique()[:3])
+            problems.append(f"Text in der Zahlenspalte '{column}' ({len(text)} Zellen, z.B. {beispiele})")
+    if problems:
+        raise ValueError("Konjunkturdaten ungültig: " + "; ".join(problems))
+
+
+def parse_konjunktur(xlsx_path):
+    df = read_workbook_cached(xlsx_path)
+    validate_konjunktur(df)
+
+    # Stelle sicher, dass alle Jahre den gleichen Datentyp haben (int)
+    df['Jahr'] = df['Jahr'].astype(int)
+    # Textspalten einheitlich als Text (Excel liefert z.B. Codes teils als Zahl), Zahlenspalten,
+    # die nur leere Zellen enthalten, einheitlich als float
+    for column in KONJUNKTUR_TEXT_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    for column in df.columns:
+        if column not in KONJUNKTUR_TEXT_COLUMNS and not pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column]).astype("float64")
+    return df
+
+
+def build_konjunktur(df):
+    # Sortierung und Zeitachse
+    df['Quartal_Sortierung'] = df['Monat'].map(QUARTALE)
+    df = df.sort_values(by=['Jahr', 'Quartal_Sortierung']).reset_index(drop=True)
+    df['Zeitachse'] = df['Jahr'].astype(str) + '-' + df['Monat']
+
+    meta = {"jahre": [int(df['Jahr'].min()), int(df['Jahr'].max())]}
+    return df, meta
+
+
+PARSERS = {
+    "aussenhandel": parse_trade,
+    "konjunktur": parse_konjunktur,
+}
+
+BUILDERS = {
+    "aussenhandel": build_trade,
+    "konjunktur": build_konjunktur,
+}
+
+# Spalten, die erst beim Aufbereiten entstehen; vor dem Mischen mit neuen Zeilen entfernt
+BUILT_COLUMNS = {
+    "aussenhandel": [QOQ_COLUMN],
+    "konjunktur": ["Quartal_Sortierung", "Zeitachse"],
+}
+
+# Quartale, deren angezeigte Werte sich mit einem geänderten Quartal ändern (Außenhandel:
+# die Veränderung zum Vorjahresquartal des Folgejahres)
+DEPENDENT_QUARTERS = {
+    "aussenhandel": [0, 4],
+    "konjunktur": [0],
+}
+
+# Abgeleitete Tabellen, die zusammen mit dem Datensatz (gleiche Version) abgelegt werden
+DERIVED = {
+    "aussenhandel": {"cube": build_cube},
+    "konjunktur": {
+        "indikatoren": indicators.build_derived,
+        "korrelation": indicators.build_lag_correlations,
+    },
+}
+
+
+# --- Ablage ---------------------------------------------------------------------------
+
+def source_files(name):
+    # Passende Quelldateien in Lieferreihenfolge (älteste zuerst, neuere gewinnen)
+    files = sorted(Path().glob(SOURCES[name]), key=lambda path: (path.stat().st_mtime, path.name))
+    if not files:
+        raise FileNotFoundError(f"Keine Quelldatei für '{name}' gefunden ({SOURCES[name]})")
+    return files
+
+
+def source_state(path):
+    stat = os.stat(path)
+    return {"file": str(path), "mtime": stat.st_mtime, "size": stat.st_size}
+
+
+def pending_sources(info, files):
+    # (neue oder geänderte Dateien, ob eine bereits übernommene Datei fehlt)
+    known = {source["file"]: source for source in info["sources"]}
+    pending = []
+    for path in files:
+        state = source_state(path)
+        source = known.get(state["file"])
+        if source is None or source["mtime"] != state["mtime"] or source["size"] != state["size"]:
+            pending.append(path)
+    removed = bool(set(known) - {str(path) for path in files})
+    return pending, removed
+
+
+def row_quarters(df):
+    # Quartalsschlüssel je Zeile (Monate zählen zu ihrem Quartal, TOTAL zu keinem)
+    monat = df["Monat"].astype(str)
+    quartal = monat.map(QUARTALE).fillna((monat.map(MONATE) - 1) // 3 + 1)
+    return period_key(df["Jahr"].astype(int), quartal)
+
+
+def merge_rows(name, old, new):
+    # Neue Zeilen anhängen, geänderte (revidierte) ersetzen. Gibt die gemischten Zeilen und
+    # die Quartale zurück, deren Werte neu sind oder sich geändert haben.
+    keys = ROW_KEYS[name]
+    values = [column for column in new.columns if column not in keys and column in old.columns]
+    probe = new[keys + values].merge(old[keys + values], on=keys, how="left",
+                                     suffixes=("", " (alt)"), indicator=True)
+    changed = (probe["_merge"] == "left_only").to_numpy().copy()
+    if set(new.columns) - set(old.columns):
+        # Neue Spalte (z.B. zusätzlicher Indikator): alle gelieferten Zeilen übernehmen,
+        # sonst fehlten ihre Werte in den unveränderten Zeilen
+        changed[:] = True
+    for column in values:
+        if name == "aussenhandel" and column == YOY_COLUMN:
+            continue  # wird ohnehin neu berechnet
+        current, previous = probe[column], probe[f"{column} (alt)"]
+        same = (current == previous) | (current.isna() & previous.isna())
+        changed |= ~same.fillna(False).to_numpy(dtype=bool)
+
+    new_rows = new[changed]
+    merged = pd.concat([old, new_rows], ignore_index=True).drop_duplicates(keys, keep="last")
+    quarters = set(row_quarters(new_rows).dropna().astype(int).tolist())
+    return merged, quarters
+
+
+def stored_rows(name, info):
+    # Bestehenden Datensatz wieder in Rohzeilen zurückführen (ohne abgeleitete Spalten)
+    df = read_dataset(info).drop(columns=BUILT_COLUMNS[name])
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(str).where(df[column].notna())
+    return df.astype({"Jahr": "int64"})
+
+
+# Ein Abgleich je Datensatz zur selben Zeit (Warm-up, Hintergrund-Abgleich, Skriptläufe):
+# wer während eines laufenden Einlesens kommt, wartet und übernimmt dessen Ergebnis,
+# statt dieselben Dateien ein zweites Mal einzulesen
+_refresh_locks = {name: threading.Lock() for name in SOURCES}
+
+
+def refresh(name, full=False):
+    # Gleicht den Datensatz mit den Quelldateien ab und gibt die aktuelle Beschreibung
+    # zurück. Nur neue oder geänderte Dateien werden eingelesen und eingemischt; ganz neu
+    # aufgebaut wird nur, wenn es noch keinen gültigen Datensatz gibt, eine übernommene
+    # Datei entfernt wurde oder `full` gesetzt ist.
+    with _refresh_locks[name]:
+        files = source_files(name)
+        info = load_info(name)
+        if full or not _usable(info):
+            return ingest(name, files)
+        pending, removed = pending_sources(info, files)
+        if removed:
+            return ingest(name, files)
+        if not pending:
+            return info
+        return ingest(name, pending, previous=info)
+
+
+def warm_up(names=None, full=False, prepare=None):
+    # Gleicht alle Datensätze gleichzeitig ab (je Datensatz ein Thread) und ruft danach
+    # optional prepare(info) auf, z.B. um sie in den Speicher der App zu laden. Gibt je
+    # Datensatz ein Future mit der Beschreibung zurück; Fehler stecken im Future.
+    # Threads statt Prozesse: Parsen und Schreiben laufen großteils in pandas/pyarrow ohne
+    # GIL, und die geladenen DataFrames werden im aufrufenden Prozess gebraucht.
+    names = list(names or SOURCES)
+
+    def run(name):
+        info = refresh(name, full=full)
+        if prepare:
+            prepare(info)
+        return info
+
+    executor = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="ik-dashboard-warmup")
+    futures = {name: executor.submit(run, name) for name in names}
+    executor.shutdown(wait=False)
+    return futures
+
+
+def ingest(name, files, previous=None):
+    # Quelldateien einlesen, prüfen, (in den vorherigen Datensatz) mischen, aufbereiten und
+    # als neue Version ablegen. Erst Datensatz, dann Beschreibung schreiben (jeweils atomar
+    # per os.replace): laufende Skriptläufe lesen die alte Version zu Ende, neue sehen die
+    # neue, parallel laufende Prozesse nie eine halb geschriebene.
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    rows = stored_rows(name, previous) if previous else None
+    sources = list(previous["sources"]) if previous else []
+    changed = set()
+    for path in files:
+        parsed = PARSERS[name](path)
+        if rows is None:
+            rows, quarters = parsed, set(row_quarters(parsed).dropna().astype(int).tolist())
+        else:
+            rows, quarters = merge_rows(name, rows, parsed)
+        changed |= quarters
+        sources = [source for source in sources if source["file"] != str(path)]
+        sources.append({**source_state(path), "sha256": file_hash(path)})
+
+    df, meta = BUILDERS[name](rows)
+    if previous and "korrigierte_veraenderungsraten" in meta:
+        meta["korrigierte_veraenderungsraten"] += previous.get("korrigierte_veraenderungsraten", 0)
+
+    version = hashlib.sha256(" ".join(source["sha256"] for source in sources).encode()).hexdigest()[:12]
+    if previous and version == previous["version"]:
+        # Nur Zeitstempel geändert (gleicher Inhalt): Datensatz bleibt, Beschreibung wird
+        # aktualisiert, damit die Datei nicht bei jedem Abgleich erneut eingelesen wird
+        info = {**previous, "sources": sources}
+        _write_info(info)
+        return info
+    affected = sorted({quarter + offset for quarter in changed for offset in DEPENDENT_QUARTERS[name]})
+    info = {
+        "name": name,
+        "format": FORMAT_VERSION,
+        "version": version,
+        "file": f"{name}-{version}.feather",
+        "sources": sources,
+        "rows": len(df),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        # Nur bei inkrementeller Übernahme: welche Quartale sich gegenüber der Vorversion
+        # geändert haben (Figuren anderer Zeiträume bleiben gültig)
+        "vorherige_version": previous["version"] if previous else None,
+        "geaenderte_quartale": affected,
+        **meta,
+    }
+
+    _write_table(df, dataset_path(info))
+    info["derived"] = {}
+    for kind, build in DERIVED.get(name, {}).items():
+        table = build(df, meta)
+        info["derived"][kind] = {"file": f"{name}-{kind}-{version}.feather", "rows": len(table)}
+        _write_table(table, derived_path(info, kind))
+
+    before = load_info(name)
+    _write_info(info)
+
+    # Ältere Versionen entfernen, die direkte Vorversion aber behalten: Skriptläufe und
+    # API-Anfragen, die deren Beschreibung schon haben, aber eine Tabelle erst noch öffnen
+    # (eingeklappte Abschnitte, Dashboard-Spalten, Würfel), lesen sie so noch zu Ende
+    current = set()
+    for kept in [info] + ([before] if _usable(before) else []):
+        current |= {kept["file"]} | {derived["file"] for derived in kept.get("derived", {}).values()}
+        if name == "konjunktur":
+            current |= {workbook_sidecar_path(source["sha256"]).name for source in kept["sources"]}
+    for old in SNAPSHOT_DIR.glob(f"{name}-*.feather"):
+        if old.name not in current:
+            try:
+                old.unlink(missing_ok=True)
+            except OSError:
+                pass  # unter Windows noch gemappt; wird beim nächsten Aufräumen entfernt
+    return info
+
+
+def _write_info(info):
+    tmp = info_path(info["name"]).with_name(f"{info['name']}.json.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(info, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, info_path(info["name"]))
+
+
+def _write_table(df, target):
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    # Unkomprimiert, nur so ist Memory-Mapping möglich
+    try:
+        feather.write_feather(df, tmp, compression='uncompressed')
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, target)
+
+
+def _usable(info):
+    if info is None or info.get("format") != FORMAT_VERSION or not dataset_path(info).exists():
+        return False
+    return all(derived_path(info, kind).exists() for kind in info["derived"])
+
+
+def is_stale(info, name):
+    if not _usable(info):
+        return True
+    pending, removed = pending_sources(info, source_files(name))
+    return bool(pending) or removed
+
+
+def load_info(name):
+    path = info_path(name)
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def dataset_info(name):
+    # Beschreibung des aktuellen Datensatzes für den Skriptlauf. Neue Quelldateien
+    # übernimmt der Abgleich im Hintergrund (start_watcher); hier wird nur eingelesen,
+    # wenn es noch gar keinen gültigen Datensatz gibt.
+    info = load_info(name)
+    if not _usable(info):
+        info = refresh(name)
+    return info
+
+
+# Höchstens ein Hintergrund-Abgleich je Prozess (z.B. auch nach st.cache_resource.clear())
+_watcher = {"thread": None}
+_watcher_lock = threading.Lock()
+
+
+def start_watcher(interval, names=None, on_refresh=None):
+    # Hintergrund-Thread, der alle `interval` Sekunden data/ auf neue oder geänderte
+    # Quelldateien prüft und sie übernimmt. on_refresh(info) wird nach jeder neuen Version
+    # aufgerufen. Fehlerhafte Lieferungen (auch halb kopierte Dateien) werden einmal
+    # gemeldet, die alte Version bleibt aktiv, bis die Datei korrigiert oder entfernt ist.
+    # Kein Fehler beendet den Thread, sonst blieben die Daten ohne Meldung stehen. Läuft
+    # im Prozess schon ein Abgleich, wird dieser zurückgegeben.
+    with _watcher_lock:
+        if _watcher["thread"] is not None and _watcher["thread"].is_alive():
+            return _watcher["thread"]
+        _watcher["thread"] = _start_watcher(interval, names, on_refresh)
+        return _watcher["thread"]
+
+
+def _start_watcher(interval, names, on_refresh):
+    names = list(names or SOURCES)
+    reported = {}
+
+    def run():
+        while True:
+            time.sleep(interval)
+            for name in names:
+                try:
+                    before = load_info(name)
+                    info = refresh(name)
+                    if before is None or info["version"] != before.get("version"):
+                        logger.info("Datenabgleich %s: neue Version %s", name, info["version"])
+                        if on_refresh:
+                            on_refresh(info)
+                except Exception as e:
+                    message = str(e) if isinstance(e, (ValueError, FileNotFoundError)) else f"{type(e).__name__}: {e}"
+                    if reported.get(name) != message:
+                        logger.warning("Datenabgleich %s: %s", name, message)
+                        reported[name] = message
+                    continue
+                reported.pop(name, None)
+
+    thread = threading.Thread(target=run, name="ik-dashboard-datenabgleich", daemon=True)
+    thread.start()
+    return thread
+
+
+def read_dataset(info, columns=None):
+    return feather.read_feather(dataset_path(info), columns=columns, memory_map=True)
+
+
+def read_derived(info, kind, columns=None):
+    return feather.read_feather(derived_path(info, kind), columns=columns, memory_map=True)
+
+
+def table_columns(path):
+    # Spaltennamen eines abgelegten Datensatzes (nur das Schema, ohne die Daten zu lesen)
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def _quartal_mask(batch, first_year, last_year):
+    # Nur Quartalswerte (keine Monate, kein TOTAL) in Tsd. EUR im gewünschten Jahresfenster
+    return pc.and_(
+        pc.and_(
+            pc.is_in(batch.column("Monat"), value_set=pa.array(['Q1', 'Q2', 'Q3', 'Q4'])),
+            pc.equal(batch.column("Maßeinheit"), "Tsd. EUR"),
+        ),
+        pc.and_(
+            pc.greater_equal(batch.column("Jahr"), first_year),
+            pc.less_equal(batch.column("Jahr"), last_year),
+        ),
+    )
+
+
+def load_quarterly(info):
+    # Liest den Datensatz batchweise, filtert jede Batch sofort und behält nur die
+    # Diagramm-Spalten. So wird nie der komplette Rohdatensatz als DataFrame aufgebaut.
+    # Das Jahresfenster stammt aus den Daten selbst (siehe build_trade).
+    first_year, last_year = info["jahre"]
+    columns = list(QUARTAL_COLUMNS)
+    with pa.memory_map(str(dataset_path(info))) as source:
+        reader = pa.ipc.open_file(source)
+        schema = pa.schema([reader.schema.field(name) for name in columns])
+        batches = []
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            mask = _quartal_mask(batch, first_year, last_year)
+            batches.append(batch.filter(mask).select(columns))
+        df = pa.Table.from_batches(batches, schema=schema).to_pandas()
+
+    df = df.rename(columns=QUARTAL_COLUMNS)
+    for column in ["Import/Export", "Polymerart/Packmittel"]:
+        df[column] = df[column].cat.remove_unused_categories()
+
+    # Jahr + Quartal zu einem ganzzahligen Periodenschlüssel zusammenfassen
+    df.insert(2, "Periode", period_key(df["Jahr"].astype("int32"), df["Monat"].map(QUARTALE).astype("int32")))
+    return df.drop(columns=["Jahr", "Monat"])
+
+
+def build_series_index(df):
+    # (Handelsrichtung, Polymerart/Packmittel) -> zeitlich sortierte Quartalsreihe.
+    # Einmal pro Datenversion aufgebaut; eine Auswahl ist danach nur noch ein Dict-Zugriff.
+    index = {}
+    for key, group in df.groupby(["Import/Export", "Polymerart/Packmittel"], sort=False):
+        index[key] = group.sort_values("Periode")
+    return index
+
+
+def build_cube_index(cube):
+    # (Handelsrichtung, Gruppe, Ebene, Granularität) -> zeitlich sortierter Ausschnitt des
+    # Würfels. Eine Drill-down-Auswahl ist danach ein Dict-Zugriff plus Zeitraumfilter.
+    index = {}
+    keys = ["Import/Export", "Gruppe", "Ebene", "Granularität"]
+    for key, group in cube.groupby(keys, sort=False, observed=True):
+        index[key] = group.drop(columns=keys).reset_index(drop=True)
+    return index
+
+
+def select_cube(cube_index, hierarchie, richtung, packmittel, granularitaet, zeitraeume, aufschluesseln=False):
+    # Ausschnitt des Würfels für eine Außenhandel-Auswahl: ein Gesamt-Aggregat (optional nach
+    # Warennummern aufgeschlüsselt) oder die Warennummern einer Polymerart, gefiltert auf die
+    # Quartale in `zeitraeume` (Monate über ihr Quartal: Monatsschlüssel // 3)
+    gruppe = packmittel if packmittel in hierarchie else next(
+        (g for g, members in hierarchie.items() if packmittel in members), packmittel)
+    ebene = "Gesamt" if packmittel in hierarchie and not aufschluesseln else "Warennummer"
+    ausschnitt = cube_index.get((richtung, gruppe, ebene, granularitaet))
+    if ausschnitt is None:
+        return pd.DataFrame(columns=["Periode", "Polymerart/Packmittel", "Warennummer", CUBE_VALUE, CUBE_CHANGE])
+    periode = ausschnitt["Periode"]
+    if granularitaet == "Monat":
+        periode = periode // 3
+    mask = periode.isin(zeitraeume)
+    if ebene == "Warennummer" and not aufschluesseln:
+        mask &= ausschnitt["Polymerart/Packmittel"] == packmittel
+    return ausschnitt[mask]
@@ -0,0 +1,42 @@
+import numpy as np
+
+# Formerhaltendes Ausdünnen langer Zeitreihen (Largest-Triangle-Three-Buckets, LTTB):
+# je Bucket bleibt der Punkt, der mit dem zuletzt gewählten Punkt und dem Mittelwert des
+# nächsten Buckets das größte Dreieck bildet. Spitzen und Täler bleiben so sichtbar,
+# obwohl nur ein Bruchteil der Punkte an den Browser geht.
+#
+# Die x-Werte sind in den Dashboards Kategorien ('2024-Q3'), daher wird mit den
+# Positionen 0..n-1 gerechnet; zurückgegeben werden die Indizes der behaltenen Punkte.
+
+
+def lttb(y, threshold):
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    valid = np.flatnonzero(~np.isnan(y))
+    if threshold < 3 or len(valid) <= threshold:
+        return np.arange(n)
+
+    # Nur gültige Punkte ausdünnen; von jeder Folge leerer Werte bleibt der erste erhalten,
+    # damit Lücken in der Linie (z.B. Indikatoren, die erst später erhoben werden) bleiben
+    x = valid.astype(float)
+    values = y[valid]
+    keep = [0]
+    edges = np.linspace(1, len(valid) - 1, threshold - 1).astype(int)
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[edges[i + 1]:edges[i + 2]].mean()
+            next_y = values[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], values[-1]
+        a = keep[-1]
+        area = np.abs(
+            (x[a] - next_x) * (values[start:end] - values[a])
+            - (x[a] - x[start:end]) * (next_y - values[a])
+        )
+        keep.append(start + int(area.argmax()))
+    keep.append(len(valid) - 1)
+
+    missing = np.isnan(y)
+    gaps = np.flatnonzero(missing & ~np.r_[False, missing[:-1]])
+    return np.union1d(valid[keep], gaps)
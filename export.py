@@ -0,0 +1,75 @@
+import io
+
+import openpyxl
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Export der aktuell angezeigten Daten (Download-Buttons unter den Diagrammen in app.py).
+# Exportiert wird genau der gefilterte Ausschnitt des Diagramms aus den typisierten,
+# zwischengespeicherten Daten. Alle Formate werden blockweise (CHUNK_ROWS Zeilen) in einen
+# Binärpuffer geschrieben, ohne die ganze Datei vorher als Text aufzubauen; die fertigen
+# Bytes hält die App je Auswahl und Datenversion im Export-Cache.
+
+# Zeilen je geschriebenem Block (wie in api.py)
+CHUNK_ROWS = 500
+
+# CSV im deutschen Format wie die Destatis-Quelldatei: Semikolon als Trenner, Dezimalkomma
+# (so öffnet Excel mit deutschen Ländereinstellungen die Datei direkt in Spalten)
+CSV_OPTIONS = {"sep": ";", "decimal": ","}
+
+
+def view_rows(df, columns=None):
+    # Zeitachse als erste Spalte "Zeitraum", interne Periodenschlüssel entfallen
+    # (gleiche Spalten wie die Antworten von api.py)
+    zeitachse = "Zeitachse" if "Zeitachse" in df.columns else "Jahr-Monat"
+    columns = [c for c in (columns or df.columns) if c not in (zeitachse, "Periode")]
+    return df[[zeitachse] + columns].rename(columns={zeitachse: "Zeitraum"}).reset_index(drop=True)
+
+
+def chunks(rows):
+    for start in range(0, len(rows), CHUNK_ROWS):
+        yield rows.iloc[start:start + CHUNK_ROWS]
+
+
+def write_csv(rows, sink):
+    # UTF-8 mit BOM, damit Excel die Umlaute richtig erkennt
+    text = io.TextIOWrapper(sink, encoding="utf-8-sig", newline="", write_through=True)
+    rows.iloc[:0].to_csv(text, index=False, **CSV_OPTIONS)
+    for chunk in chunks(rows):
+        chunk.to_csv(text, index=False, header=False, **CSV_OPTIONS)
+    text.detach()
+
+
+def write_xlsx(rows, sink):
+    # write_only: Zeilen werden direkt in die Arbeitsmappe gestreamt
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Daten")
+    sheet.append(list(rows.columns))
+    for chunk in chunks(rows):
+        # Fehlende Werte als leere Zellen (NaN ist in xlsx kein gültiger Wert)
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            sheet.append(list(row))
+    workbook.save(sink)
+
+
+def write_parquet(rows, sink):
+    schema = pa.Schema.from_pandas(rows, preserve_index=False)
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for chunk in chunks(rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+# Format -> (Dateiendung, MIME-Typ, Schreibfunktion)
+FORMATS = {
+    "CSV": ("csv", "text/csv", write_csv),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", write_xlsx),
+    "Parquet": ("parquet", "application/vnd.apache.parquet", write_parquet),
+}
+
+
+def export_bytes(rows, fmt):
+    sink = io.BytesIO()
+    FORMATS[fmt][2](rows, sink)
+    return sink.getvalue()
+
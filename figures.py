@@ -0,0 +1,247 @@
+import os
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+import dashboards
+import data_store
+import downsample
+
+# Aufbau der Plotly-Figuren ohne Streamlit: app.py zeigt sie an (mit Figuren-Cache),
+# prerender.py schreibt die Standardansichten als statische Dateien. Beide greifen auf
+# dieselben Builder und dieselben Voreinstellungen (Dashboards: dashboards.py) zu, damit
+# die statischen Ansichten exakt der Startansicht der App entsprechen.
+
+# Beginn der Standardansicht (Vor-Corona-Niveau als Vergleichsbasis). Das Ende ergibt sich
+# aus dem Datenstand, bei neuen Quartalen muss hier nichts angepasst werden.
+DEFAULT_START_YEAR = 2019
+
+
+def default_years(years):
+    # Standardmäßig nur Jahre ab 2019 vorauswählen
+    return [year for year in years if year >= DEFAULT_START_YEAR]
+
+
+# Ab dieser Punktzahl je Diagramm werden die Linien als WebGL-Traces (Scattergl) gezeichnet
+# und formerhaltend ausgedünnt (siehe downsample.py). Volle Auflösung gibt es wieder, sobald
+# der Zeitraum-Filter so eng ist, dass die Punktzahl unter der Schwelle liegt.
+MAX_POINTS = int(os.environ.get("IK_DASHBOARD_MAX_POINTS", "2000"))
+
+
+def line_trace(filtered_df, indicator, yaxis, color, max_points=None):
+    x = filtered_df['Zeitachse']
+    y = filtered_df[indicator]
+    if max_points is None:
+        return go.Scatter(
+            x=x,
+            y=y,
+            name=indicator,
+            yaxis=yaxis,
+            mode='lines+markers',
+            line=dict(color=color)
+        )
+
+    keep = downsample.lttb(y.to_numpy(dtype=float, na_value=np.nan), max_points)
+    return go.Scattergl(
+        x=x.iloc[keep],
+        y=y.iloc[keep],
+        name=indicator,
+        yaxis=yaxis,
+        mode='lines+markers',
+        line=dict(color=color)
+    )
+
+
+def build_dashboard_figure(dashboard_name, selected_indicators, filtered_df, umrechnung=None, columns=None):
+    # `columns` sind die gezeichneten Spalten zu den gewählten Indikatoren (bei einer
+    # Umrechnung die abgeleiteten, sonst die Indikatoren selbst). Y-Achse je Indikator und
+    # Achsentitel kommen aus der Registry (dashboards.py): erst die Linien der linken, dann
+    # die der rechten Achse; die rechte Achse gibt es nur, wenn dort etwas gezeichnet wird.
+    fig = go.Figure()
+    colors = ['#1f77b4', '#ff7f0e', '#2ca02c']
+    columns = columns or selected_indicators
+    # Abgeleitete Indikatoren (siehe indicators.py): Umrechnung im Titel und an der linken Achse
+    title = f"Entwicklung ({dashboard_name}, {umrechnung})" if umrechnung else f"Entwicklung ({dashboard_name})"
+
+    # Lange Zeitreihen: WebGL und ausgedünnte Linien (max_points je Linie), sonst alle Punkte
+    max_points = None
+    if selected_indicators and len(filtered_df) * len(selected_indicators) > MAX_POINTS:
+        max_points = MAX_POINTS // len(selected_indicators)
+
+    sides = [dashboards.axis(dashboard_name, indicator) for indicator in selected_indicators]
+    left = [column for column, side in zip(columns, sides) if side == "links"]
+    right = [column for column, side in zip(columns, sides) if side == "rechts"]
+
+    for i, column in enumerate(left + right):
+        fig.add_trace(line_trace(
+            filtered_df,
+            column,
+            yaxis='y1' if i < len(left) else 'y2',
+            color=colors[i],
+            max_points=max_points
+        ))
+
+    fig.update_layout(
+        title=title,
+        xaxis=dict(
+            title="Zeitraum",
+            #titlefont=dict(color="#000000"),
+            tickfont=dict(color="#000000"),
+            tickangle=45
+        ),
+        yaxis=dict(
+            title=(umrechnung or dashboards.axis_title(dashboard_name, "links")) if left else None,
+            #titlefont=dict(color="#000000"),
+            tickfont=dict(color="#000000"),
+            tickformat=',',
+            separatethousands=True,
+            rangemode='tozero'
+        ),
+        yaxis2=dict(
+            title=dashboards.axis_title(dashboard_name, "rechts"),
+            #titlefont=dict(color="#000000"),
+            tickfont=dict(color="#000000"),
+            overlaying="y",
+            side="right",
+            type='linear',
+            tickformat=',',
+            separatethousands=True,
+            rangemode='tozero'
+        ) if right else None,
+        height=400,
+        template="plotly_white",
+        showlegend=True,
+        margin=dict(l=40, r=40, t=40, b=80)
+    )
+    if max_points is not None:
+        # Jede Linie behält andere Punkte; Plotly ordnet Kategorien nach dem ersten Auftreten
+        # über alle Linien, daher die Zeitachse ausdrücklich in der Reihenfolge der Daten
+        fig.update_xaxes(categoryorder="array", categoryarray=filtered_df['Zeitachse'].tolist())
+
+    return fig
+
+
+def build_lag_figure(serie, frueh, ziel):
+    # Korrelation je Vorlauf (in Quartalen) zwischen Frühindikator und Zielgröße
+    fig = go.Figure(go.Bar(
+        x=serie["Vorlauf"],
+        y=serie["Korrelation"],
+        marker=dict(color=np.where(serie["Vorlauf"] > 0, '#1f77b4', '#c7c7c7')),
+        name="Korrelation"
+    ))
+    fig.update_layout(
+        title=f"Korrelation: {frueh} mit {ziel}",
+        xaxis=dict(
+            title=f"Vorlauf von {frueh} in Quartalen",
+            tickfont=dict(color="#000000"),
+            dtick=1
+        ),
+        yaxis=dict(
+            title="Korrelation",
+            tickfont=dict(color="#000000"),
+            range=[-1, 1]
+        ),
+        height=400,
+        template="plotly_white",
+        showlegend=False,
+        margin=dict(l=40, r=40, t=40, b=80)
+    )
+    return fig
+
+
+def calculate_dynamic_y_range(max_value):
+    # Dynamische Schrittweiten und Obergrenzen für verschiedene Größenordnungen
+    if max_value <= 1000:
+        y_max = int(np.ceil(max_value / 100.0)) * 100  # Schritte zu 100
+        y_max = max(y_max, 1000)  # Mindest-y_max für Sichtbarkeit
+    elif max_value <= 10000:
+        y_max = int(np.ceil(max_value / 1000.0)) * 1000  # Schritte zu 1.000
+    elif max_value <= 100000:
+        y_max = int(np.ceil(max_value / 10000.0)) * 10000  # Schritte zu 10.000
+    else:
+        y_max = int(np.ceil(max_value / 100000.0)) * 100000  # Schritte zu 100.000
+    return y_max
+
+
+def build_trade_figure(df_filtered, y_spalte, y_range, y_label, anzeigeart,
+                       color="Import/Export", legend_title="Handelsrichtung", title=None, barmode="relative"):
+    fig = px.bar(
+        df_filtered,
+        x="Jahr-Monat",
+        y=y_spalte,
+        color=color,
+        hover_data=["Warennummer"] if "Warennummer" in df_filtered.columns else None,
+        labels={
+            "Jahr-Monat": "Zeitraum",
+            y_spalte: y_label,
+            color: legend_title
+        },
+        barmode=barmode,
+        title=title or f"Entwicklung des Außenhandels ({anzeigeart})"
+    )
+
+    fig.update_yaxes(range=y_range)
+
+    # Layout-Anpassungen für bessere Darstellung
+    (fig.update_layout
+        (xaxis=dict(
+            title="Zeitraum",
+            tickangle=45,  # Drehrichtung der X-Achsen-Beschriftung anpassen
+            tickfont=dict(color="black")  # Achsenbeschriftung in Schwarz
+        ),
+        yaxis=dict(
+            title=y_label,
+            range=y_range,
+            tickformat=",",  # Keine Abkürzungen wie M oder K auf der Y-Achse, sondern absolute Zahlen
+            tickfont=dict(color="black")  # Achsenbeschriftung in Schwarz
+        ),
+        legend_title=legend_title,
+        bargap=0.2,  # Abstand zwischen Balken
+    ))
+
+    return fig
+
+
+# Titel der Anzeigeart bei Monatsauflösung
+MONATS_ANZEIGEART = {
+    "Prozentuale Veränderung zum Vorjahresquartal": "Prozentuale Veränderung zum Vorjahresmonat",
+    "Absolute Quartalsentwicklung (Tsd. EUR)": "Absolute Monatsentwicklung (Tsd. EUR)",
+}
+
+
+# Anzeigearten im Außenhandel (Standard: absolute Quartalsentwicklung)
+ANZEIGEARTEN = ["Prozentuale Veränderung zum Vorjahresquartal", "Absolute Quartalsentwicklung (Tsd. EUR)"]
+DEFAULT_ANZEIGEART = 1
+
+
+def default_periods(zeitraeume, letztes_quartal):
+    # Nur Zeiträume ab 2019 bis einschließlich zum letzten gemeldeten Quartal
+    return [
+        z for z in zeitraeume
+        if data_store.period_key(DEFAULT_START_YEAR, 1) <= z <= letztes_quartal
+    ]
+
+
+def filter_series(serie, zeitraeume):
+    # Die Reihe ist bereits nach Zeit (Periode) sortiert, gefiltert wird nur noch
+    # innerhalb der gewählten Reihe; die Zeitraum-Beschriftung entsteht erst für die Anzeige
+    df_filtered = serie[serie["Periode"].isin(zeitraeume)]
+    return df_filtered.assign(**{"Jahr-Monat": data_store.period_labels(df_filtered["Periode"])})
+
+
+def trade_y_axis(df_filtered, anzeigeart, y_prozent, gestapelt=False):
+    # Spalte, Achsenbereich und Beschriftung der Y-Achse für die gewählte Anzeigeart
+    if anzeigeart == ANZEIGEARTEN[0]:
+        return y_prozent, [-100, 100], "in Prozent"
+    y_spalte = "Tsd. EUR"
+    if not df_filtered.empty:
+        if gestapelt:
+            # Gestapelte Balken: maßgeblich ist die Summe je Zeitraum
+            max_wert = df_filtered.groupby("Periode")[y_spalte].sum().max()
+        else:
+            max_wert = df_filtered[y_spalte].max()
+        y_max = calculate_dynamic_y_range(max_wert)
+    else:
+        y_max = 1000
+    return y_spalte, [0, y_max], "in Tsd. EUR"
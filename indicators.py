@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+# Abgeleitete Indikatoren für die Konjunktur-Dashboards: gleitender Durchschnitt,
+# Veränderung zum Vorjahresquartal, Index auf Basisjahr = 100 und Kreuzkorrelationen mit
+# Vor-/Nachlauf zwischen allen Indikatoren. Alles wird beim Aufbereiten einmal pro
+# Datenversion über ganze Spalten berechnet (data_store.DERIVED) und liegt dann als
+# abgeleitete Tabelle neben dem Datensatz; im Skriptlauf wird nur noch ausgewählt.
+#
+# Gerechnet wird auf der lückenlosen Quartalsachse (Periodenschlüssel Jahr * 4 + Quartal - 1,
+# wie data_store.period_key): fehlt ein Quartal, bleibt der Wert leer, statt über die Lücke
+# hinweg zu verschieben.
+
+BASE_YEAR = 2019
+ROLLING_QUARTERS = 4
+MAX_LAG = 8
+
+# Umrechnung -> (Auswahltext, Namenszusatz der abgeleiteten Spalte)
+UMRECHNUNGEN = {
+    "gleitend": ("Gleitender Durchschnitt (4 Quartale)", "gleitender Ø 4 Quartale"),
+    "vorjahr": ("Veränderung zum Vorjahresquartal (%)", "ggü. Vorjahresquartal in %"),
+    "basis": (f"Index ({BASE_YEAR} = 100)", f"{BASE_YEAR} = 100"),
+}
+
+# Spalten des Datensatzes, die keine Indikatoren sind
+NON_INDICATOR_COLUMNS = ["Jahr", "Quartal_Sortierung"]
+
+
+def column_name(indicator, kind):
+    return f"{indicator} ({UMRECHNUNGEN[kind][1]})"
+
+
+def indicator_columns(df):
+    return [c for c in df.select_dtypes("number").columns if c not in NON_INDICATOR_COLUMNS]
+
+
+def quarterly_frame(df):
+    # Indikatoren auf der lückenlosen Quartalsachse (Index = Periodenschlüssel)
+    keys = df["Jahr"] * 4 + df["Quartal_Sortierung"] - 1
+    values = df[indicator_columns(df)].set_axis(keys.to_numpy())
+    return values.reindex(np.arange(keys.min(), keys.max() + 1)), keys
+
+
+def build_derived(df, meta):
+    # Eine Zeile je Zeile des Datensatzes (gleiche Reihenfolge), eine Spalte je abgeleitetem
+    # Indikator. Vorjahresvergleich und Basisjahr nur für durchgehend positive Reihen
+    # (Umsätze, Beschäftigte, HWWI-Preisindizes); für die Salden der IK-Umfrage (-100..+100)
+    # sind Prozentveränderungen und Basisindizes nicht sinnvoll.
+    full, keys = quarterly_frame(df)
+    positive = [c for c in full.columns if (full[c].dropna() > 0).all() and full[c].notna().any()]
+    base = full.loc[(full.index // 4) == BASE_YEAR, positive].mean()
+
+    parts = [
+        full.rolling(ROLLING_QUARTERS, min_periods=ROLLING_QUARTERS).mean()
+            .rename(columns=lambda c: column_name(c, "gleitend")),
+        (full[positive] / full[positive].shift(4) - 1).mul(100)
+            .rename(columns=lambda c: column_name(c, "vorjahr")),
+        full[positive].div(base.where(base != 0)).mul(100)
+            .rename(columns=lambda c: column_name(c, "basis")),
+    ]
+    derived = pd.concat(parts, axis=1).reindex(keys.to_numpy())
+    return derived.reset_index(drop=True).astype("float64")
+
+
+def comparison_series(df, derived):
+    # Vergleichsreihe je Indikator für die Kreuzkorrelation: positive Niveaureihen über ihre
+    # Veränderung zum Vorjahresquartal (sonst dominiert der gemeinsame Trend), Salden direkt
+    columns = {}
+    for indicator in indicator_columns(df):
+        yoy = column_name(indicator, "vorjahr")
+        columns[indicator] = derived[yoy] if yoy in derived.columns else df[indicator]
+    keys = df["Jahr"] * 4 + df["Quartal_Sortierung"] - 1
+    frame = pd.DataFrame(columns).set_axis(keys.to_numpy())
+    return frame.reindex(np.arange(keys.min(), keys.max() + 1))
+
+
+def build_lag_correlations(df, meta):
+    # Korrelation zwischen Frühindikator (t) und Zielgröße (t + Vorlauf) für alle Paare und
+    # Vorläufe -MAX_LAG..MAX_LAG. Je Vorlauf eine einzige Matrix-Berechnung über alle Spalten.
+    series = comparison_series(df, build_derived(df, meta))
+    names = list(series.columns)
+    target = series.add_prefix("Ziel: ")
+    frames = []
+    for lag in range(-MAX_LAG, MAX_LAG + 1):
+        matrix = pd.concat([series.shift(lag), target], axis=1).corr(min_periods=8)
+        block = matrix.loc[names, target.columns].to_numpy()
+        frames.append(pd.DataFrame({
+            "Frühindikator": np.repeat(names, len(names)),
+            "Zielgröße": np.tile(names, len(names)),
+            "Vorlauf": lag,
+            "Korrelation": block.ravel(),
+        }))
+    table = pd.concat(frames, ignore_index=True)
+    table = table[table["Frühindikator"] != table["Zielgröße"]].reset_index(drop=True)
+    return table.astype({"Vorlauf": "int16", "Korrelation": "float64"})
+
+
+def dependent_quarters(kind, quarters):
+    # Quartale, deren Daten in die abgeleiteten Werte der gezeigten Quartale eingehen
+    # (Figuren-Cache: ändert sich eines davon, muss die Figur neu aufgebaut werden)
+    quarters = set(quarters)
+    if kind == "gleitend":
+        quarters |= {q - offset for q in quarters for offset in range(1, ROLLING_QUARTERS)}
+    elif kind == "vorjahr":
+        quarters |= {q - 4 for q in quarters}
+    elif kind == "basis":
+        quarters |= set(range(BASE_YEAR * 4, BASE_YEAR * 4 + 4))
+    return tuple(sorted(quarters))
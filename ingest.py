@@ -0,0 +1,71 @@
+import argparse
+import sys
+
+import data_store
+
+# Offline-Aufbereitung der Rohdaten für die App: liest die Destatis-CSV und die
+# IK/HWWI-Arbeitsmappe, prüft das Schema, berechnet die Veränderungsraten zum
+# Vorjahr/Vorquartal neu und legt je Quelle einen versionierten, typisierten Datensatz
+# in data/cache/ ab. Die App lädt diese Datensätze unverändert; der verfügbare Zeitraum
+# wird aus den Daten abgeleitet, bei neuen Quartalen muss kein Code angepasst werden.
+#
+# Neue Lieferungen einfach nach data/ legen (Dateimuster siehe data_store.SOURCES): es wird
+# nur die neue Datei eingelesen und in den bestehenden Datensatz gemischt. Die laufende App
+# übernimmt neue Dateien auch selbst im Hintergrund.
+#
+#   python ingest.py                      # neue/geänderte Quelldateien übernehmen
+#   python ingest.py --full               # alle Datensätze komplett neu aufbauen
+#   python ingest.py --check              # nur prüfen, ob die Datensätze aktuell sind
+
+
+def describe(info):
+    line = f"{info['name']}: Version {info['version']}, {info['rows']} Zeilen, Jahre {info['jahre'][0]}-{info['jahre'][1]}"
+    if "quartale" in info:
+        first, last = info["quartale"]
+        line += f", Quartale {data_store.period_label(first)} bis {data_store.period_label(last)}"
+    if info.get("korrigierte_veraenderungsraten"):
+        line += f", {info['korrigierte_veraenderungsraten']} Veränderungsraten aus der Quelle korrigiert"
+    if info.get("vorherige_version"):
+        changed = info["geaenderte_quartale"]
+        line += f", geändert gegenüber {info['vorherige_version']}: {len(changed)} Quartale"
+        if changed:
+            line += f" ({data_store.period_label(changed[0])} bis {data_store.period_label(changed[-1])})"
+    for kind, derived in info.get("derived", {}).items():
+        line += f", {kind}: {derived['rows']} Zeilen"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rohdaten für das IK-Dashboard prüfen und aufbereiten")
+    parser.add_argument("--full", action="store_true",
+                        help="Datensätze aus allen Quelldateien komplett neu aufbauen")
+    parser.add_argument("--check", action="store_true",
+                        help="Nichts schreiben, nur melden, ob die Datensätze aktuell sind")
+    args = parser.parse_args(argv)
+
+    status = 0
+    # Beide Quellen gleichzeitig einlesen; Ausgabe in fester Reihenfolge
+    futures = {} if args.check else data_store.warm_up(full=args.full)
+    for name in data_store.SOURCES:
+        if args.check:
+            try:
+                stale = data_store.is_stale(data_store.load_info(name), name)
+            except FileNotFoundError as e:
+                print(f"{name}: FEHLER: {e}", file=sys.stderr)
+                status = 1
+                continue
+            print(f"{name}: {'veraltet' if stale else 'aktuell'}")
+            status |= int(stale)
+            continue
+        try:
+            info = futures[name].result()
+        except (ValueError, FileNotFoundError) as e:
+            print(f"{name}: FEHLER: {e}", file=sys.stderr)
+            status = 1
+            continue
+        print(describe(info))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,404 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from streamlit.runtime.state.common import user_key_from_element_id
+
+# Lasttest für app.py mit vielen gleichzeitigen Besuchern: startet die App wie im Betrieb
+# mit `streamlit run` und verbindet N simulierte Browser-Sitzungen über den Websocket der
+# App (/_stcore/stream). Jede Sitzung spricht das Protokoll des Browsers: Skriptlauf
+# anfordern, Widgets aus den Deltas übernehmen, Widget-Werte ändern und erneut ausführen
+# lassen (Widgets in einem Fragment nur das Fragment). Läuft komplett offline gegen die
+# mitgelieferten Daten in data/.
+#
+# Jede Sitzung wählt ein Besucherprofil (feste Interaktionsfolge, siehe PROFILE) und wartet
+# zwischen zwei Klicks eine zufällige Bedenkzeit. Berichtet werden je Stufe Durchsatz
+# (Skriptläufe pro Sekunde), Latenz-Perzentile je Interaktion (vom Senden bis zum Ende des
+# Skriptlaufs, wie im Browser) und der Speicher (RSS) des Server-Prozesses: vor der Stufe,
+# Spitze, mit allen Sitzungen offen und nach dem Schließen. Die simulierten Browser laufen
+# im Prozess des Lasttests und teilen sich die CPU mit dem Server.
+#
+#   python loadtest.py                          # Stufen mit 20, 50 und 100 Sitzungen
+#   python loadtest.py --sessions 10 --think 0  # 10 Sitzungen ohne Bedenkzeit (Volllast)
+#   python loadtest.py --sessions 50 --json     # Ergebnis als JSON
+#   python loadtest.py --url http://host:8501   # gegen eine bereits laufende App
+
+APP_PATH = Path(__file__).with_name("app.py")
+DEFAULT_STAGES = [20, 50, 100]
+FIRST_RUN = "Erstaufruf"
+
+
+# --- Interaktionen ----------------------------------------------------------------------
+# Jede Interaktion setzt wie der Browser den neuen Wert eines Widgets und gibt dessen
+# Fragment zurück ("" = ganze Seite); danach folgt ein Skriptlauf.
+
+def set_multiselect(label, values):
+    def interact(session):
+        widget = session.widget("multiselect", label=label)
+        state = WidgetState(id=widget.id)
+        state.string_array_value.data[:] = [str(value) for value in values]
+        return session.set_state(state)
+    return interact
+
+
+def set_selectbox(key, index):
+    def interact(session):
+        widget = session.widget("selectbox", key=key)
+        return session.set_state(WidgetState(id=widget.id, string_value=widget.options[index]))
+    return interact
+
+
+def set_radio(index, key=None):
+    def interact(session):
+        widget = session.widget("radio", key=key)
+        return session.set_state(WidgetState(id=widget.id, string_value=widget.options[index]))
+    return interact
+
+
+def set_checkbox(key, value):
+    def interact(session):
+        widget = session.widget("checkbox", key=key)
+        return session.set_state(WidgetState(id=widget.id, bool_value=value))
+    return interact
+
+
+# Besucherprofile: (Name, Gewicht, Interaktionen); jede Interaktion ist ein Skriptlauf
+PROFILE = [
+    ("Konjunktur", 4, [
+        ("Jahre ändern", set_multiselect("Jahre auswählen:", [2021, 2022, 2023, 2024])),
+        ("Konjunktur-Indikatoren tauschen", set_multiselect("Indikatoren für Konjunktur:", ["Index_Ertrag", "Index_Absatz"])),
+        ("Darstellung umrechnen", set_selectbox("umrechnung_Konjunktur", 1)),
+        ("Frühindikator wählen", set_selectbox("vorlauf_frueh", 0)),
+    ]),
+    ("Außenhandel", 4, [
+        ("Anzeigeart umschalten", set_radio(0)),
+        ("Polymerart ändern", set_selectbox("polymer_filter", 5)),
+        ("Handelsrichtung ändern", set_selectbox("direction_filter", 1)),
+        ("Monate anzeigen", set_radio(1, key="aufloesung")),
+        ("Gesamt-Aggregat wählen", set_selectbox("polymer_filter", 0)),
+        ("Nach Warennummern aufschlüsseln", set_checkbox("drilldown", True)),
+    ]),
+    ("Kurzbesuch", 2, []),
+]
+
+# Reihenfolge der Interaktionen im Bericht
+STEPS = [FIRST_RUN] + [step for _, _, interactions in PROFILE for step, _ in interactions]
+
+WIDGET_TYPES = ["multiselect", "selectbox", "radio", "checkbox"]
+
+
+class AppError(Exception):
+    pass
+
+
+class Session:
+    # Eine simulierte Browser-Sitzung: merkt sich die Widgets aus den empfangenen Deltas und
+    # die geänderten Widget-Werte, die bei jedem Skriptlauf mitgeschickt werden
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.connection = None
+        self.widgets = {}  # Widget-ID -> (Typ, Proto, Fragment-ID)
+        self.states = {}   # Widget-ID -> WidgetState
+
+    async def connect(self):
+        self.connection = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.connection is not None:
+            await self.connection.close()
+
+    def widget(self, kind, key=None, label=None):
+        for widget_kind, proto, _ in self.widgets.values():
+            if widget_kind != kind:
+                continue
+            if key is not None and user_key_from_element_id(proto.id) != key:
+                continue
+            if label is not None and proto.label != label:
+                continue
+            return proto
+        raise AppError(f"Widget nicht gefunden: {kind} {key or label or ''}".strip())
+
+    def set_state(self, state):
+        self.states[state.id] = state
+        return self.widgets[state.id][2]
+
+    async def run(self, fragment_id=""):
+        # Skriptlauf anfordern und bis zu seinem Ende lesen; gibt die empfangenen Bytes zurück
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        msg.rerun_script.fragment_id = fragment_id
+        await self.connection.send(msg.SerializeToString())
+
+        received = 0
+        async with asyncio.timeout(self.timeout):
+            while True:
+                raw = await self.connection.recv()
+                received += len(raw)
+                forward = ForwardMsg()
+                forward.ParseFromString(raw)
+                kind = forward.WhichOneof("type")
+                if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                    self._register(forward.delta)
+                elif kind == "script_finished":
+                    if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                        raise AppError("Skript nicht ausführbar")
+                    return received
+
+    def _register(self, delta):
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            raise AppError(f"App-Fehler: {element.exception.type}: {element.exception.message}")
+        if kind in WIDGET_TYPES:
+            proto = getattr(element, kind)
+            self.widgets[proto.id] = (kind, proto, delta.fragment_id)
+
+
+# --- Server und Messung -----------------------------------------------------------------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port):
+    command = [
+        sys.executable, "-m", "streamlit", "run", str(APP_PATH),
+        "--server.headless=true", f"--server.port={port}", "--server.address=127.0.0.1",
+        "--server.fileWatcherType=none", "--browser.gatherUsageStats=false",
+    ]
+    env = {**os.environ, "IK_DASHBOARD_LAZY": "0"}
+    return subprocess.Popen(command, cwd=APP_PATH.parent, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_healthy(base_url, process=None, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server beendet (Exit-Code {process.returncode})")
+        try:
+            with urllib.request.urlopen(f"{base_url}/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server unter {base_url} nicht erreichbar")
+
+
+def process_rss_mb(pid):
+    # Aktueller residenter Speicher eines Prozesses (Linux: /proc); None, wenn unbekannt
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return None
+
+
+async def sample_rss(pid, peak, stop, interval=0.2):
+    # Spitzen-RSS während der Stufe (peak ist eine einelementige Liste)
+    while not stop.is_set():
+        rss = process_rss_mb(pid)
+        if rss is not None:
+            peak[0] = max(peak[0] or 0.0, rss)
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except TimeoutError:
+            pass
+
+
+def percentile(values, q):
+    # Nächster Rang; reicht für Latenzberichte
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def latency_summary(values, received):
+    return {
+        "anzahl": len(values),
+        "p50_ms": percentile(values, 50) * 1000,
+        "p90_ms": percentile(values, 90) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": max(values) * 1000,
+        "kib_je_lauf": sum(received) / len(received) / 1024,
+    }
+
+
+async def visitor(index, url, args, results, sessions):
+    # Ein Besucher: Seite laden, dann die Interaktionen seines Profils mit Bedenkzeit
+    rng = random.Random(args.seed * 100003 + index)
+    name, _, interactions = rng.choices(PROFILE, weights=[weight for _, weight, _ in PROFILE])[0]
+    results["profile"][name] = results["profile"].get(name, 0) + 1
+    await asyncio.sleep(args.ramp * index / max(args.count, 1))
+
+    session = Session(url, args.timeout)
+    sessions.append(session)
+    for step, interact in [(FIRST_RUN, None)] + interactions:
+        if interact is not None:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think))
+        try:
+            if interact is None:
+                await session.connect()
+                fragment_id = ""
+            else:
+                fragment_id = interact(session)
+            start = time.perf_counter()
+            received = await session.run(fragment_id)
+            results["latenz"].setdefault(step, []).append(time.perf_counter() - start)
+            results["bytes"].setdefault(step, []).append(received)
+        except (AppError, TimeoutError, OSError, websockets.WebSocketException) as e:
+            # Der Lasttest läuft weiter, nur diese Sitzung endet mit dem Fehler
+            results["fehler"].append(f"{step}: {type(e).__name__}: {e}")
+            return
+
+
+async def run_stage(url, pid, args):
+    results = {"profile": {}, "latenz": {}, "bytes": {}, "fehler": []}
+    sessions = []
+    rss_before = process_rss_mb(pid)
+    peak, stop = [rss_before], asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(pid, peak, stop))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(visitor(i, url, args, results, sessions) for i in range(args.count)))
+    wall = time.perf_counter() - start
+
+    # Alle Sitzungen sind noch offen (Sitzungszustand, Figuren), wie bei offenen Browser-Tabs
+    rss_open = process_rss_mb(pid)
+    await asyncio.gather(*(session.close() for session in sessions))
+    await asyncio.sleep(args.settle)
+    rss_closed = process_rss_mb(pid)
+    stop.set()
+    await sampler
+
+    runs = sum(len(values) for values in results["latenz"].values())
+    stage = {
+        "sitzungen": args.count,
+        "profile": results["profile"],
+        "dauer_s": wall,
+        "skriptlaeufe": runs,
+        "durchsatz_pro_s": runs / wall if wall else 0.0,
+        "fehler": len(results["fehler"]),
+        "fehlermeldungen": sorted(set(results["fehler"]))[:5],
+        "latenz": {step: latency_summary(results["latenz"][step], results["bytes"][step])
+                   for step in STEPS if step in results["latenz"]},
+    }
+    if runs:
+        stage["latenz"]["Gesamt"] = latency_summary(
+            [value for values in results["latenz"].values() for value in values],
+            [value for values in results["bytes"].values() for value in values])
+    if rss_before is not None:
+        stage["rss_mb"] = {
+            "vorher": rss_before,
+            "spitze": peak[0],
+            "sitzungen_offen": rss_open,
+            "nach_schliessen": rss_closed,
+            "je_sitzung": (rss_open - rss_before) / args.count,
+        }
+    return stage
+
+
+def print_stage(stage):
+    profiles = ", ".join(f"{name}: {count}" for name, count in sorted(stage["profile"].items()))
+    print(f"{stage['sitzungen']} Sitzungen ({profiles}): {stage['skriptlaeufe']} Skriptläufe in "
+          f"{stage['dauer_s']:.1f} s, {stage['durchsatz_pro_s']:.2f} Läufe/s, {stage['fehler']} Fehler")
+    print(f"  {'Interaktion':<34}{'Anzahl':>7}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8} ms{'KiB/Lauf':>10}")
+    for step, entry in stage["latenz"].items():
+        print(f"  {step:<34}{entry['anzahl']:>7}{entry['p50_ms']:>8.0f}{entry['p90_ms']:>8.0f}"
+              f"{entry['p99_ms']:>8.0f}{entry['max_ms']:>8.0f}   {entry['kib_je_lauf']:>9.1f}")
+    if "rss_mb" in stage:
+        rss = stage["rss_mb"]
+        print(f"  RSS Server: {rss['vorher']:.1f} MB vorher, {rss['spitze']:.1f} MB Spitze, "
+              f"{rss['sitzungen_offen']:.1f} MB mit allen Sitzungen offen ({rss['je_sitzung']:.2f} MB je Sitzung), "
+              f"{rss['nach_schliessen']:.1f} MB nach dem Schließen")
+    for message in stage["fehlermeldungen"]:
+        print(f"  Fehler: {message}")
+
+
+async def run_load_test(url, pid, args):
+    # Eine erste Sitzung füllt die gemeinsamen Caches, wie der erste Besucher nach dem Start
+    session = Session(url, args.timeout)
+    await session.connect()
+    start = time.perf_counter()
+    await session.run()
+    await session.close()
+    result = {
+        "erstaufruf_s": time.perf_counter() - start,
+        "stufen": [],
+        "meta": {"think_s": args.think, "ramp_s": args.ramp, "seed": args.seed,
+                 "cpus": os.cpu_count(), "python": sys.version.split()[0]},
+    }
+    if not args.json:
+        print(f"Erstaufruf (Caches füllen): {result['erstaufruf_s'] * 1000:.0f} ms")
+    for count in args.sessions:
+        args.count = count
+        stage = await run_stage(url, pid, args)
+        result["stufen"].append(stage)
+        if not args.json:
+            print_stage(stage)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lasttest für das IK-Dashboard mit vielen gleichzeitigen Sitzungen")
+    parser.add_argument("--sessions", type=int, nargs="+", default=DEFAULT_STAGES,
+                        help="Anzahl gleichzeitiger Sitzungen je Stufe (Standard: 20 50 100)")
+    parser.add_argument("--think", type=float, default=1.0,
+                        help="Mittlere Bedenkzeit zwischen zwei Klicks in Sekunden (0 = Volllast)")
+    parser.add_argument("--ramp", type=float, default=5.0,
+                        help="Zeitraum in Sekunden, über den die Sitzungen einer Stufe starten")
+    parser.add_argument("--seed", type=int, default=1, help="Startwert für Profilwahl und Bedenkzeiten")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Höchstdauer eines Skriptlaufs in Sekunden")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="Wartezeit nach dem Schließen der Sitzungen, bevor der RSS gemessen wird")
+    parser.add_argument("--url", help="Bereits laufende App testen statt einen Server zu starten")
+    parser.add_argument("--pid", type=int, help="Prozess-ID der laufenden App für die RSS-Messung (mit --url)")
+    parser.add_argument("--json", action="store_true", help="Ergebnis als JSON ausgeben")
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.url:
+        base_url, pid = args.url.rstrip("/"), args.pid
+    else:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = start_server(port)
+        pid = process.pid
+    try:
+        wait_until_healthy(base_url, process)
+        ws_url = base_url.replace("http", "ws", 1) + "/_stcore/stream"
+        result = asyncio.run(run_load_test(ws_url, pid, args))
+    except (RuntimeError, AppError, TimeoutError, OSError, websockets.WebSocketException) as e:
+        print(f"FEHLER: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    return int(any(stage["fehler"] for stage in result["stufen"]))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import base64
+import json
+import os
+import threading
+
+import numpy as np
+
+# Kompakte Plotly-Figuren für die Übertragung an den Browser. Aus dem JSON einer Figur
+#   - wird das Template auf die Teile gekürzt, die die enthaltenen Trace-Typen nutzen
+#     (plotly_white bringt z.B. Vorgaben für Karten, 3D, Heatmaps usw. mit),
+#   - werden Zahlenreihen als möglichst kleine Binär-Arrays (base64) kodiert, aber nur
+#     verlustfrei: ganzzahlige Werte als int8/16/32, sonst float32, wenn exakt darstellbar.
+# Die Größe vorher/nachher wird je Diagramm festgehalten (Debug-Panel, benchmark.py).
+
+ENABLED = os.environ.get("IK_DASHBOARD_COMPACT", "1") != "0"
+
+# Template-Layout-Einträge, die nur für bestimmte Trace-Typen gebraucht werden
+SUBPLOT_DEFAULTS = {
+    "polar": ("scatterpolar", "scatterpolargl", "barpolar"),
+    "ternary": ("scatterternary",),
+    "scene": ("scatter3d", "surface", "mesh3d", "cone", "streamtube", "volume", "isosurface"),
+    "geo": ("scattergeo", "choropleth"),
+    "mapbox": ("scattermapbox", "choroplethmapbox", "densitymapbox"),
+    "map": ("scattermap", "choroplethmap", "densitymap"),
+}
+
+INT_TYPES = [("i1", np.int8), ("i2", np.int16), ("i4", np.int32)]
+
+_lock = threading.Lock()
+_report = {}
+
+
+def trim_template(spec):
+    layout = spec.get("layout", {})
+    template = layout.get("template")
+    if not isinstance(template, dict):
+        return
+    types = {trace.get("type", "scatter") for trace in spec.get("data", [])}
+    uses_colorscale = any(
+        "coloraxis" in trace or "colorscale" in trace
+        or "coloraxis" in trace.get("marker", {}) or "colorscale" in trace.get("marker", {})
+        for trace in spec.get("data", [])
+    ) or "coloraxis" in layout
+
+    template["data"] = {name: value for name, value in template.get("data", {}).items() if name in types}
+    trimmed = {}
+    for name, value in template.get("layout", {}).items():
+        if name in SUBPLOT_DEFAULTS and not types.intersection(SUBPLOT_DEFAULTS[name]):
+            continue
+        if name in ("coloraxis", "colorscale") and not uses_colorscale:
+            continue
+        if name == "annotationdefaults" and not layout.get("annotations"):
+            continue
+        if name == "shapedefaults" and not layout.get("shapes"):
+            continue
+        trimmed[name] = value
+    template["layout"] = trimmed
+
+
+def compact_array(value):
+    # {'dtype': 'f8', 'bdata': ...} -> kleinster verlustfreier Typ
+    if value.get("dtype") != "f8" or "shape" in value:
+        return value
+    array = np.frombuffer(base64.b64decode(value["bdata"]), dtype="<f8")
+    if np.isfinite(array).all() and (array == np.round(array)).all():
+        for dtype, numpy_type in INT_TYPES:
+            info = np.iinfo(numpy_type)
+            if len(array) == 0 or (array.min() >= info.min and array.max() <= info.max):
+                return {"dtype": dtype, "bdata": base64.b64encode(array.astype(f"<{dtype}").tobytes()).decode()}
+    as_float32 = array.astype("<f4")
+    if np.array_equal(as_float32.astype("<f8"), array, equal_nan=True):
+        return {"dtype": "f4", "bdata": base64.b64encode(as_float32.tobytes()).decode()}
+    return value
+
+
+def compact_arrays(node):
+    if isinstance(node, dict):
+        if "bdata" in node and "dtype" in node:
+            return compact_array(node)
+        return {key: compact_arrays(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [compact_arrays(value) for value in node]
+    return node
+
+
+def compact(spec_json, label):
+    # Nimmt das JSON einer Figur (fig.to_json()) und gibt das kompakte JSON zurück
+    if not ENABLED:
+        size = len(spec_json.encode("utf-8"))
+        record(label, size, size)
+        return spec_json
+    spec = json.loads(spec_json)
+    trim_template(spec)
+    spec["data"] = compact_arrays(spec.get("data", []))
+    compact_json = json.dumps(spec, separators=(",", ":"), ensure_ascii=False)
+    record(label, len(spec_json.encode("utf-8")), len(compact_json.encode("utf-8")))
+    return compact_json
+
+
+def record(label, before, after):
+    with _lock:
+        _report[label] = {"vorher_bytes": before, "nachher_bytes": after}
+
+
+def report():
+    with _lock:
+        return [{"diagramm": label, **sizes} for label, sizes in sorted(_report.items())]
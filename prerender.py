@@ -0,0 +1,282 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+from plotly.offline import get_plotlyjs
+
+import dashboards
+import data_store
+import payload
+from figures import (ANZEIGEARTEN, DEFAULT_ANZEIGEART,
+                     build_dashboard_figure, build_trade_figure, default_periods, default_years,
+                     filter_series, trade_y_axis)
+
+# Statische Standardansichten: die meisten Besucher ändern nichts an der Startansicht
+# (Konjunktur, Arbeitsmarkt und Rohstoffe mit den vorausgewählten Indikatoren ab 2019,
+# Außenhandel absolut mit der ersten Handelsrichtung und Polymerart). Diese Figuren werden
+# hier einmal je Datenversion mit denselben Buildern wie in der App (figures.py) erzeugt
+# und als Dateien abgelegt:
+#   - <ansicht>.json  kompakte Plotly-Figur (payload.py) zum Einbetten, z.B. per
+#                     Plotly.newPlot(div, spec.data, spec.layout)
+#   - <ansicht>.html  eigenständige Seite (plotly.min.js liegt einmal daneben)
+#   - index.html      Landing-Seite mit allen Standardansichten und Link zur App
+#   - manifest.json   Datenversionen und Liste der Ansichten
+# Die Dateien können von einem Webserver vor der App oder auf der IK-Website ausgeliefert
+# werden; die App selbst stellt static/ unter /app/static/ bereit (.streamlit/config.toml).
+# Mit laufender App werden vorhandene Ansichten nach jeder neuen Datenlieferung im
+# Hintergrund neu erzeugt.
+#
+#   python prerender.py                    # Standardansichten nach static/prerender/
+#   python prerender.py --all-combinations # zusätzlich jede Handelsrichtung × Polymerart
+#   python prerender.py --check            # nur prüfen, ob die Ansichten aktuell sind
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_DIR = Path("static/prerender")
+MANIFEST = "manifest.json"
+PLOTLY_JS = "plotly.min.js"
+
+# Link zur interaktiven App auf den statischen Seiten
+APP_URL = os.environ.get("IK_DASHBOARD_APP_URL", "/")
+
+PAGE = """<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<script src="{plotly_js}"></script>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 0 auto; max-width: 1200px; padding: 1rem; }}
+h1, h2 {{ color: #004996; }}
+.hinweis {{ background-color: #00B2A9; color: white; padding: 1rem; border-radius: 5px; }}
+.hinweis a {{ color: white; }}
+</style>
+</head>
+<body>
+<h1>{heading}</h1>
+<p class="hinweis">Datenstand: {stand}. <a href="{app_url}">Interaktives Dashboard öffnen</a>, um Indikatoren, Zeiträume und Filter selbst zu wählen.</p>
+{sections}
+</body>
+</html>
+"""
+
+SECTION = """<h2>{title}</h2>
+<div id="{div_id}" style="height: {height}px;"></div>
+<script>
+(function () {{
+  var spec = {spec};
+  Plotly.newPlot("{div_id}", spec.data, spec.layout, {{"responsive": true}});
+}})();
+</script>
+"""
+
+
+def slug(text):
+    text = text.lower()
+    for umlaut, ersatz in (("ä", "ae"), ("ö", "oe"), ("ü", "ue"), ("ß", "ss")):
+        text = text.replace(umlaut, ersatz)
+    return re.sub(r"[^a-z0-9]+", "-", text).strip("-")
+
+
+def konjunktur_views(info):
+    # Standardansicht der Konjunktur-Dashboards (dashboards.py): alle Jahre ab 2019, alle Quartale
+    df = data_store.read_dataset(info)
+    years = sorted(df["Jahr"].unique().tolist())
+    filtered_df = df[
+        (df["Jahr"].isin(default_years(years))) &
+        (df["Monat"].isin(list(data_store.QUARTALE)))
+    ]
+    for name, dashboard in dashboards.DASHBOARDS.items():
+        if dashboard["quelle"] != info["name"]:
+            continue
+        indicators = dashboard["standard"]
+        yield {
+            "ansicht": slug(name),
+            "titel": name,
+            "standard": True,
+            "auswahl": {"indikatoren": indicators, "jahre": default_years(years)},
+            "figur": build_dashboard_figure(name, indicators, filtered_df),
+        }
+
+
+def aussenhandel_views(info, all_combinations=False):
+    # Standardansicht des Außenhandels (erste Handelsrichtung und Polymerart wie in den
+    # Auswahlfeldern der App), optional zusätzlich jede Kombination als eigene Ansicht
+    df = data_store.load_quarterly(info)
+    series_index = data_store.build_series_index(df)
+    zeitraeume = default_periods(sorted(df["Periode"].unique().tolist()), info["quartale"][1])
+    anzeigeart = ANZEIGEARTEN[DEFAULT_ANZEIGEART]
+    richtungen = df["Import/Export"].dropna().unique().tolist()
+    packmittel = df["Polymerart/Packmittel"].dropna().unique().tolist()
+
+    combinations = [(richtungen[0], packmittel[0], True)]
+    if all_combinations:
+        combinations += [(r, p, False) for r in richtungen for p in packmittel]
+    for richtung, polymer, standard in combinations:
+        serie = series_index.get((richtung, polymer), df.iloc[0:0])
+        df_filtered = filter_series(serie, zeitraeume)
+        y_spalte, y_range, y_label = trade_y_axis(df_filtered, anzeigeart, "prozentuale Veränderung zum Vorjahresquartal")
+        yield {
+            "ansicht": "aussenhandel" if standard else f"aussenhandel-{slug(richtung)}-{slug(polymer)}",
+            "titel": "Außenhandel" if standard else f"Außenhandel: {richtung}, {polymer}",
+            "standard": standard,
+            "auswahl": {
+                "anzeigeart": anzeigeart,
+                "handelsrichtung": richtung,
+                "polymerart_packmittel": polymer,
+                "zeitraeume": [data_store.period_label(z) for z in (zeitraeume[0], zeitraeume[-1])] if zeitraeume else [],
+            },
+            "figur": build_trade_figure(df_filtered, y_spalte, y_range, y_label, anzeigeart),
+        }
+
+
+def section(view, spec):
+    # JSON im <script>-Block: "</" maskieren, damit kein Wert das Skript vorzeitig beendet
+    return SECTION.format(
+        title=view["titel"],
+        div_id=f"fig-{view['ansicht']}",
+        height=view["figur"].layout.height or 450,
+        spec=spec.replace("</", "<\\/"),
+    )
+
+
+def page(title, sections, stand, app_url):
+    return PAGE.format(
+        title=f"{title} – IK Wirtschaftsstatistik",
+        heading="IK Wirtschaftsstatistik" if title == "Übersicht" else title,
+        plotly_js=PLOTLY_JS,
+        stand=stand,
+        app_url=app_url,
+        sections="\n".join(sections),
+    )
+
+
+def write_file(path, text):
+    # Erst vollständig schreiben, dann ersetzen: ein Webserver liefert nie halbe Dateien aus
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def render(infos, out_dir=OUTPUT_DIR, all_combinations=False, app_url=APP_URL):
+    # Erzeugt alle Ansichten zu den übergebenen Datenversionen und gibt das Manifest zurück
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if not (out_dir / PLOTLY_JS).exists():
+        write_file(out_dir / PLOTLY_JS, get_plotlyjs())
+
+    stand = (f"Konjunktur bis {infos['konjunktur']['jahre'][1]}, "
+             f"Außenhandel bis {data_store.period_label(infos['aussenhandel']['quartale'][1])}")
+
+    views = list(konjunktur_views(infos["konjunktur"]))
+    views += aussenhandel_views(infos["aussenhandel"], all_combinations)
+
+    entries, landing = [], []
+    for view in views:
+        spec = payload.compact(view["figur"].to_json(), f"statisch: {view['titel']}")
+        write_file(out_dir / f"{view['ansicht']}.json", spec)
+        write_file(out_dir / f"{view['ansicht']}.html", page(view["titel"], [section(view, spec)], stand, app_url))
+        if view["standard"]:
+            landing.append(section(view, spec))
+        entries.append({
+            "ansicht": view["ansicht"],
+            "titel": view["titel"],
+            "standard": view["standard"],
+            "auswahl": view["auswahl"],
+            "json": f"{view['ansicht']}.json",
+            "html": f"{view['ansicht']}.html",
+        })
+    write_file(out_dir / "index.html", page("Übersicht", landing, stand, app_url))
+
+    # Ansichten aus früheren Läufen, die es nicht mehr gibt (z.B. ohne --all-combinations)
+    keep = {name for entry in entries for name in (entry["json"], entry["html"])}
+    keep |= {"index.html", MANIFEST, PLOTLY_JS}
+    for path in out_dir.iterdir():
+        if path.suffix in (".json", ".html") and path.name not in keep:
+            path.unlink()
+
+    manifest = {
+        "erzeugt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "versionen": {name: info["version"] for name, info in infos.items()},
+        "alle_kombinationen": all_combinations,
+        "ansichten": entries,
+    }
+    # Das Manifest zuletzt: es beschreibt erst dann die neue Version, wenn alles liegt
+    write_file(out_dir / MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=2))
+    return manifest
+
+
+def load_manifest(out_dir=OUTPUT_DIR):
+    try:
+        return json.loads((Path(out_dir) / MANIFEST).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def is_stale(manifest, infos):
+    return manifest is None or manifest["versionen"] != {name: info["version"] for name, info in infos.items()}
+
+
+def refresh_if_present(info, out_dir=OUTPUT_DIR):
+    # Hook für data_store.start_watcher: wurden die Ansichten schon einmal erzeugt, werden
+    # sie nach einer neuen Datenversion mit denselben Optionen neu geschrieben
+    manifest = load_manifest(out_dir)
+    if manifest is None:
+        return
+    infos = {name: data_store.dataset_info(name) for name in data_store.SOURCES}
+    if not is_stale(manifest, infos):
+        return
+    try:
+        render(infos, out_dir, manifest.get("alle_kombinationen", False))
+    except (OSError, ValueError) as e:
+        # Der Datenabgleich läuft weiter; die alten Ansichten bleiben bis zum nächsten Versuch
+        logger.warning("Statische Ansichten: %s", e)
+        return
+    logger.info("Statische Ansichten nach %s %s neu erzeugt", info["name"], info["version"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Standardansichten des IK-Dashboards als statische Dateien erzeugen")
+    parser.add_argument("--out", default=str(OUTPUT_DIR),
+                        help=f"Zielverzeichnis (Standard: {OUTPUT_DIR})")
+    parser.add_argument("--all-combinations", action="store_true",
+                        help="Zusätzlich jede Kombination aus Handelsrichtung und Polymerart/Packmittel erzeugen")
+    parser.add_argument("--app-url", default=APP_URL,
+                        help="Link zur interaktiven App auf den statischen Seiten")
+    parser.add_argument("--check", action="store_true",
+                        help="Nichts schreiben, nur melden, ob die Ansichten zur aktuellen Datenversion passen")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.check:
+            infos = {name: data_store.load_info(name) for name in data_store.SOURCES}
+            if None in infos.values():
+                raise FileNotFoundError("Datensätze fehlen, bitte zuerst python ingest.py ausführen")
+        else:
+            infos = {name: data_store.refresh(name) for name in data_store.SOURCES}
+    except (ValueError, FileNotFoundError) as e:
+        print(f"FEHLER: {e}", file=sys.stderr)
+        return 1
+
+    if args.check:
+        stale = is_stale(load_manifest(args.out), infos)
+        print(f"{args.out}: {'veraltet' if stale else 'aktuell'}")
+        return int(stale)
+
+    start = time.perf_counter()
+    manifest = render(infos, args.out, args.all_combinations, args.app_url)
+    for entry in manifest["ansichten"]:
+        size = (Path(args.out) / entry["json"]).stat().st_size
+        print(f"{entry['ansicht']}: {size / 1024:.1f} kB")
+    print(f"{len(manifest['ansichten'])} Ansichten in {time.perf_counter() - start:.2f} s nach {args.out} geschrieben")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
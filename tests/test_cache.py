@@ -0,0 +1,34 @@
+import cache
+
+
+def entry_sizes(lru):
+    return sum(size for _, size, _ in lru._data.values())
+
+
+def test_rekey_collision_keeps_byte_count():
+    # Zwei alte Einträge bekommen denselben neuen Schlüssel, ein dritter trifft einen
+    # schon vorhandenen: übrig bleibt je Schlüssel ein Eintrag, die Bytes stimmen weiter
+    lru = cache.LRUCache(maxsize=10)
+    lru.put(("a", "v1"), "x" * 100)
+    lru.put(("a", "v1b"), "y" * 2000)
+    lru.put(("b", "v1"), "z" * 300)
+    lru.put(("b", "v2"), "w" * 50)
+
+    lru.rekey(lambda key: (key[0], "v2"))
+
+    assert sorted(lru._data) == [("a", "v2"), ("b", "v2")]
+    assert lru.get(("b", "v2")) == "w" * 50
+    assert lru.bytes == entry_sizes(lru)
+    assert lru.stats()["bytes"] == lru.bytes
+    assert lru.invalidations == 2
+
+
+def test_budget_holds_after_rekey():
+    lru = cache.LRUCache(maxsize=10, max_bytes=5000)
+    for i in range(6):
+        lru.put(("figur", i, "v1"), "x" * 1000)
+    lru.rekey(lambda key: (key[0], key[1] % 2, "v2"))
+    lru.put(("figur", 9, "v2"), "y" * 1000)
+
+    assert lru.bytes == entry_sizes(lru)
+    assert lru.bytes <= lru.max_bytes
@@ -0,0 +1,70 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+import data_store
+
+SOURCE = Path(__file__).resolve().parent.parent / "data" / "Destatis_Außenhandelsstatstik_Monate_Quartale_Jahre.csv"
+
+
+def write_lines(path, header, lines, mtime):
+    path.write_text("".join([header] + lines), encoding="latin1")
+    os.utime(path, (mtime, mtime))
+
+
+def split_source(data_dir):
+    # Erste Lieferung bis 2023, zweite mit 2024/2025 und einem revidierten Wert aus 2020
+    with open(SOURCE, encoding="latin1") as f:
+        header, *lines = f.readlines()
+    first = [line for line in lines if int(line[:4]) <= 2023]
+    second = [line for line in lines if int(line[:4]) > 2023]
+    revised = next(line for line in first if line.startswith("2020,0;") and ";Januar;" in line).split(";")
+    revised[4] = "123456,0"
+    second.append(";".join(revised))
+    first_path = data_dir / "Destatis_Außenhandel_1.csv"
+    second_path = data_dir / "Destatis_Außenhandel_2.csv"
+    write_lines(first_path, header, first, 1_700_000_000)
+    return header, second, second_path
+
+
+def test_merge_rows_replaces_revisions_and_adds_columns():
+    old = pd.DataFrame({"Jahr": [2020, 2020], "Monat": ["Q1", "Q2"], "Umsatz": [1.0, 2.0]})
+    new = pd.DataFrame({"Jahr": [2020, 2020], "Monat": ["Q2", "Q3"], "Umsatz": [2.5, 3.0]})
+    merged, quarters = data_store.merge_rows("konjunktur", old, new)
+    assert merged["Umsatz"].tolist() == [1.0, 2.5, 3.0]
+    assert quarters == {data_store.period_key(2020, 2), data_store.period_key(2020, 3)}
+
+    # Neue Spalte: alle gelieferten Zeilen werden übernommen, alte Zeilen ohne Wert bleiben leer
+    new = pd.DataFrame({"Jahr": [2020], "Monat": ["Q1"], "Umsatz": [1.0], "Exporte": [7.0]})
+    merged, quarters = data_store.merge_rows("konjunktur", old, new)
+    exporte = merged.set_index("Monat")["Exporte"]
+    assert exporte["Q1"] == 7.0 and pd.isna(exporte["Q2"])
+    assert quarters == {data_store.period_key(2020, 1)}
+
+
+def test_incremental_refresh_matches_full_rebuild(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    header, second, second_path = split_source(data_dir)
+
+    first_info = data_store.refresh("aussenhandel")
+    write_lines(second_path, header, second, 1_700_000_100)
+    incremental = data_store.refresh("aussenhandel")
+    assert incremental["vorherige_version"] == first_info["version"]
+    assert data_store.period_key(2020, 1) in incremental["geaenderte_quartale"]
+
+    # Der vollständige Neuaufbau schreibt dieselbe Version in dieselben Dateien:
+    # die inkrementellen Ergebnisse vorher lesen
+    keys = data_store.ROW_KEYS["aussenhandel"]
+    incremental_rows = data_store.read_dataset(incremental).sort_values(keys).reset_index(drop=True)
+    incremental_cube = data_store.read_derived(incremental, "cube")
+
+    full = data_store.refresh("aussenhandel", full=True)
+    assert full["version"] == incremental["version"]
+    assert full["vorherige_version"] is None
+    full_rows = data_store.read_dataset(full).sort_values(keys).reset_index(drop=True)
+    pd.testing.assert_frame_equal(incremental_rows, full_rows)
+    pd.testing.assert_frame_equal(incremental_cube, data_store.read_derived(full, "cube"))
+    assert incremental["korrigierte_veraenderungsraten"] == full["korrigierte_veraenderungsraten"]
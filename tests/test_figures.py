@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import figures
+
+
+def quarterly_frame(quarters):
+    periods = np.arange(2000 * 4, 2000 * 4 + quarters)
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "Zeitachse": [f"{p // 4}-Q{p % 4 + 1}" for p in periods],
+        "Umsatz": rng.normal(100, 20, quarters).cumsum(),
+        "Auslandsumsatz": rng.normal(50, 30, quarters).cumsum(),
+        "Index_Exporte": rng.normal(0, 25, quarters),
+    })
+
+
+def test_downsampled_traces_keep_time_axis_order(monkeypatch):
+    # Mehrere ausgedünnte Linien behalten verschiedene Punkte; die Zeitachse muss trotzdem
+    # in der Reihenfolge der Daten bleiben
+    monkeypatch.setattr(figures, "MAX_POINTS", 30)
+    df = quarterly_frame(120)
+    indicators = ["Umsatz", "Auslandsumsatz", "Index_Exporte"]
+    fig = figures.build_dashboard_figure("Konjunktur", indicators, df)
+
+    xs = [list(trace.x) for trace in fig.data]
+    assert all(len(x) < len(df) for x in xs)
+    assert len({tuple(x) for x in xs}) > 1
+    assert fig.layout.xaxis.categoryorder == "array"
+    assert list(fig.layout.xaxis.categoryarray) == df["Zeitachse"].tolist()
+    position = {label: i for i, label in enumerate(df["Zeitachse"])}
+    for x in xs:
+        assert [position[label] for label in x] == sorted(position[label] for label in x)
+
+
+def test_short_series_are_not_downsampled(monkeypatch):
+    monkeypatch.setattr(figures, "MAX_POINTS", 2000)
+    df = quarterly_frame(40)
+    fig = figures.build_dashboard_figure("Konjunktur", ["Umsatz", "Index_Exporte"], df)
+    assert all(list(trace.x) == df["Zeitachse"].tolist() for trace in fig.data)
+    assert fig.layout.xaxis.categoryorder is None
@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Leichtgewichtige Laufzeitmessung für die Hot-Spots in app.py (Einlesen, Filtern,
+# Figurenaufbau, Serialisierung). Jede Messung landet
+#   - in der Liste des aktuellen Skriptlaufs (für das Debug-Panel),
+#   - in prozessweiten Summen (Anzahl, Summe, Maximum),
+#   - optional als JSON-Zeile in der Datei aus IK_DASHBOARD_TIMINGS.
+
+DUMP_PATH = os.environ.get("IK_DASHBOARD_TIMINGS")
+
+# Streamlit führt jede Sitzung in einem eigenen Thread aus
+_local = threading.local()
+_lock = threading.Lock()
+_totals = {}
+
+
+def start_run():
+    _local.spans = []
+
+
+def run_spans():
+    return list(getattr(_local, "spans", []))
+
+
+def record(name, seconds):
+    ms = seconds * 1000
+    if not hasattr(_local, "spans"):
+        _local.spans = []
+    _local.spans.append({"span": name, "ms": ms})
+
+    with _lock:
+        count, total, maximum = _totals.get(name, (0, 0.0, 0.0))
+        _totals[name] = (count + 1, total + ms, max(maximum, ms))
+        if DUMP_PATH:
+            with open(DUMP_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"ts": time.time(), "pid": os.getpid(), "span": name, "ms": round(ms, 3)},
+                                   ensure_ascii=False) + "\n")
+
+
+@contextmanager
+def span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def totals():
+    with _lock:
+        return [
+            {"span": name, "count": count, "total_ms": total, "mean_ms": total / count, "max_ms": maximum}
+            for name, (count, total, maximum) in sorted(_totals.items())
+        ]
+
+
+def current_rss_mb():
+    # Aktueller residenter Speicher des Prozesses (Linux: /proc), sonst der Spitzenwert
+    # (macOS und übrige Unix-Systeme); unter Windows gibt es beides nicht, dann 0.0
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    # Spitzenwert des residenten Speichers (ru_maxrss: unter macOS in Bytes, sonst in KiB);
+    # `resource` gibt es nur unter Unix, unter Windows 0.0
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return maxrss / 1024 / 1024
+    return maxrss / 1024